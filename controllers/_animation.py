@@ -0,0 +1,110 @@
+"""
+Shared sticker animation helpers
+Cached NumPy motion schedules → translation-only animations as one preallocated frame batch,
+resize/rotate animations rendered once per distinct size/angle, in parallel threads
+"""
+
+import os
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image as PILImage
+
+STICKER_SIZE = 512
+ANGLE_STEP = 0.5  # degrees; wiggle rotations are quantized to this bucket
+
+
+@lru_cache(maxsize=32)
+def wave(num_frames: int, harmonic: int = 1, absolute: bool = False) -> np.ndarray:
+    """sin(harmonic · 2πt) sampled at t = i / num_frames — computed once per schedule (read-only)."""
+    values = np.sin(np.arange(num_frames) / num_frames * 2 * np.pi * harmonic)
+    if absolute:
+        values = np.abs(values)
+    values.flags.writeable = False
+    return values
+
+
+def vertical_offsets(animation: str, num_frames: int) -> np.ndarray:
+    """Per-frame y offsets for the float/bounce/static sticker animations."""
+    if animation == "float":
+        return (wave(num_frames) * 15).astype(int)
+    if animation == "bounce":
+        return -(wave(num_frames, absolute=True) * 25).astype(int)
+    return np.zeros(num_frames, dtype=int)  # static
+
+
+def _blit(canvas: np.ndarray, layer: np.ndarray, left: int, top: int) -> None:
+    """Copy `layer` into `canvas` at (left, top), clipped — over transparent zeros this is the exact composite."""
+    h, w = layer.shape[:2]
+    size_h, size_w = canvas.shape[:2]
+    y0, y1 = max(top, 0), min(top + h, size_h)
+    x0, x1 = max(left, 0), min(left + w, size_w)
+    if y0 < y1 and x0 < x1:
+        canvas[y0:y1, x0:x1] = layer[y0 - top:y1 - top, x0 - left:x1 - left]
+
+
+def translate_frames(image: PILImage.Image, positions, size: int = STICKER_SIZE) -> list:
+    """Place `image` at each (x, y) top-left position on a transparent size×size canvas, clipped."""
+
+    base = np.asarray(image.convert("RGBA"))
+    canvas = np.zeros((len(positions), size, size, 4), dtype=np.uint8)
+
+    for i, (x, y) in enumerate(positions):
+        _blit(canvas[i], base, int(x), int(y))
+
+    return [PILImage.fromarray(frame, "RGBA") for frame in canvas]
+
+
+def place(layer: PILImage.Image, pos: tuple, size: int = STICKER_SIZE) -> PILImage.Image:
+    """Put one layer on a fresh transparent canvas (slice copy, no alpha blend pass)."""
+    canvas = np.zeros((size, size, 4), dtype=np.uint8)
+    _blit(canvas, np.asarray(layer.convert("RGBA")), int(pos[0]), int(pos[1]))
+    return PILImage.fromarray(canvas, "RGBA")
+
+
+def _render_unique(keys, render) -> list:
+    """Render each distinct key once, in a thread pool (PIL releases the GIL in resize/rotate)."""
+
+    keys = list(keys)
+    unique = list(dict.fromkeys(keys))
+    if not unique:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(len(unique), os.cpu_count() or 1)) as executor:
+        rendered = dict(zip(unique, executor.map(render, unique)))
+
+    return [rendered[key] for key in keys]
+
+
+def pulse_frames(image: PILImage.Image, sizes, size: int = STICKER_SIZE) -> list:
+    """Scale `image` to each per-frame size, centered on a transparent canvas."""
+
+    def render(new_size):
+        scaled = image.resize((new_size, new_size), PILImage.LANCZOS)
+        offset = (size - new_size) // 2
+        return place(scaled, (offset, offset), size)
+
+    return _render_unique((int(n) for n in sizes), render)
+
+
+def rotated_frames(image: PILImage.Image, angles, resample=PILImage.BICUBIC, size: int = None) -> list:
+    """
+    Rotate `image` per frame; each 0.5° bucket is rendered once and shared between frames.
+    With `size`, each rotation is alpha-pasted centered on a transparent size×size canvas.
+    """
+
+    # Rotate in premultiplied RGBa so transparent (white) pixels don't bleed halos into the edges
+    premultiplied = image.convert("RGBa") if image.mode == "RGBA" else image
+
+    def render(bucket):
+        rotated = premultiplied.rotate(bucket, resample=resample, expand=False)
+        if rotated.mode == "RGBa":
+            rotated = rotated.convert("RGBA")
+        if size is None:
+            return rotated
+        pos = ((size - rotated.width) // 2, (size - rotated.height) // 2)
+        return place(rotated, pos, size)
+
+    buckets = (round(float(angle) / ANGLE_STEP) * ANGLE_STEP for angle in angles)
+    return _render_unique(buckets, render)
@@ -0,0 +1,101 @@
+"""
+Generative (template) cache for GPT frame prompts
+"cute <subject> turning into <state>" → reuse a previous run's prompts with the slots swapped
+"""
+
+import os
+import re
+import json
+from pathlib import Path
+
+from controllers._sqlite import Database
+
+CACHE_DIR = Path(os.environ.get("STICKER_CACHE", "./.sticker_cache"))
+DB_PATH = CACHE_DIR / "prompts.sqlite3"
+
+# Structural skeleton of transformation concepts
+TEMPLATE = re.compile(
+    r"^(?:(?:a|an|the)\s+)?"
+    r"(?:(?:cute|kawaii|little|tiny|happy|adorable|chibi|baby)\s+)*"
+    r"(?P<subject>[a-z]+)\s+"
+    r"(?P<verb>turning|transforming|changing|morphing)\s+into\s+"
+    r"(?:(?:a|an|the)\s+)?"
+    r"(?P<state>[a-z]+(?:\s+[a-z]+){0,2})$"
+)
+
+
+def _slots(concept: str):
+    """Extract (verb, subject, state) from a concept, or None if it doesn't fit the template."""
+    match = TEMPLATE.match(" ".join(concept.lower().strip(" .!?").split()))
+    if not match:
+        return None
+    return match.group("verb"), match.group("subject"), match.group("state")
+
+
+_db = Database(
+    DB_PATH,
+    """CREATE TABLE IF NOT EXISTS templates (
+        namespace TEXT NOT NULL,
+        n INTEGER NOT NULL,
+        verb TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        state TEXT NOT NULL,
+        prompts TEXT NOT NULL
+    )""",
+)
+_connect = _db.connect
+
+
+def _word(text: str) -> re.Pattern:
+    return re.compile(rf"\b{re.escape(text)}\b", re.IGNORECASE)
+
+
+def _fill(prompts: list, subject: str, state: str, new_subject: str, new_state: str):
+    """Swap slots in cached prompts; None when the cached prompts don't carry both slots clearly."""
+
+    subject_re, state_re = _word(subject), _word(state)
+
+    # Confidence check: subject named in every frame, end state named in the final frame
+    if not all(subject_re.search(p) for p in prompts) or not state_re.search(prompts[-1]):
+        return None
+
+    return [state_re.sub(new_state, subject_re.sub(new_subject, p)) for p in prompts]
+
+
+def match(concept: str, n: int, namespace: str = "default"):
+    """Return slot-substituted prompts from a structurally identical concept, or None."""
+
+    slots = _slots(concept)
+    if slots is None:
+        return None
+    verb, new_subject, new_state = slots
+
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT subject, state, prompts FROM templates WHERE namespace = ? AND n = ? AND verb = ?",
+            (namespace, n, verb)
+        ).fetchall()
+
+    for subject, state, prompts in reversed(rows):
+        if (subject, state) == (new_subject, new_state):
+            continue
+        filled = _fill(json.loads(prompts), subject, state, new_subject, new_state)
+        if filled is not None:
+            print(f"♻️ Template cache hit ('{subject} → {state}' reused for '{new_subject} → {new_state}')")
+            return filled
+
+    return None
+
+
+def remember(concept: str, n: int, prompts: list, namespace: str = "default") -> None:
+    """Store GPT prompts under their template slots (no-op for concepts that don't fit)."""
+
+    slots = _slots(concept)
+    if slots is None:
+        return
+
+    with _connect() as conn:
+        conn.execute(
+            "INSERT INTO templates (namespace, n, verb, subject, state, prompts) VALUES (?, ?, ?, ?, ?, ?)",
+            (namespace, n, *slots, json.dumps(prompts))
+        )
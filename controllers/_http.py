@@ -0,0 +1,45 @@
+"""
+Shared HTTP clients
+One pooled httpx.Client (HTTP/2 when `h2` is installed) → every Pollinations request reuses the same connection
+One pooled requests.Session with retries → Replicate / Runware output downloads
+"""
+
+import shutil
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:  # plain HTTP/1.1 keep-alive pool
+    HTTP2 = False
+
+TIMEOUT = 120
+CHUNK_SIZE = 1024 * 1024  # 1MB copy buffer for streamed downloads
+
+client = httpx.Client(
+    http2=HTTP2,
+    timeout=TIMEOUT,
+    follow_redirects=True,
+    limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+)
+
+session = requests.Session()
+session.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]),
+))
+
+
+def download(url: str, path: str, timeout: int = TIMEOUT) -> str:
+    """Stream a URL to disk without buffering the whole body in memory."""
+    with session.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        with open(path, "wb") as f:
+            shutil.copyfileobj(response.raw, f, length=CHUNK_SIZE)
+    return path
@@ -0,0 +1,146 @@
+"""
+Semantic cache for GPT frame prompts
+Concept → text-embedding-3-small vector → cosine match against previous runs (SQLite) → cached prompts
+Misses fall through to the template cache (_gen_cache) before calling GPT
+"""
+
+import os
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from openai import OpenAI
+
+from controllers import _gen_cache as gen_cache
+from controllers._sqlite import Database
+
+CACHE_DIR = Path(os.environ.get("STICKER_CACHE", "./.sticker_cache"))
+DB_PATH = CACHE_DIR / "prompts.sqlite3"
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+SIMILARITY_THRESHOLD = 0.92
+
+openai_client = OpenAI()
+
+
+def _normalize(concept: str) -> str:
+    return " ".join(concept.lower().strip(" .!?").split())
+
+
+@lru_cache(maxsize=1024)
+def _embed(normalized_concept: str) -> np.ndarray:
+    """Embed a concept once per process (unit-length float32 vector)."""
+    response = openai_client.embeddings.create(model=EMBEDDING_MODEL, input=normalized_concept)
+    vec = np.asarray(response.data[0].embedding, dtype=np.float32)
+    return vec / max(float(np.linalg.norm(vec)), 1e-6)
+
+
+_db = Database(
+    DB_PATH,
+    """CREATE TABLE IF NOT EXISTS prompts (
+        namespace TEXT NOT NULL,
+        n INTEGER NOT NULL,
+        concept TEXT NOT NULL,
+        embedding BLOB NOT NULL,
+        prompts TEXT NOT NULL
+    )""",
+)
+_connect = _db.connect
+
+
+def lookup(concept: str, n: int, namespace: str = "default"):
+    """Return cached prompts for a (semantically) matching concept, or None."""
+
+    query = _embed(_normalize(concept))
+
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT embedding, prompts FROM prompts WHERE namespace = ? AND n = ?",
+            (namespace, n)
+        ).fetchall()
+
+    if not rows:
+        return None
+
+    matrix = np.stack([np.frombuffer(emb, dtype=np.float32) for emb, _ in rows])
+    scores = np.matmul(matrix, query)
+    best = int(np.argmax(scores))
+
+    if scores[best] < SIMILARITY_THRESHOLD:
+        return None
+
+    print(f"♻️ Prompt cache hit (similarity {scores[best]:.3f})")
+    return json.loads(rows[best][1])
+
+
+def store(concept: str, n: int, prompts: list, namespace: str = "default") -> None:
+    """Remember prompts generated for a concept."""
+
+    normalized = _normalize(concept)
+    embedding = _embed(normalized)
+
+    with _connect() as conn:
+        conn.execute(
+            "INSERT INTO prompts (namespace, n, concept, embedding, prompts) VALUES (?, ?, ?, ?, ?)",
+            (namespace, n, normalized, embedding.tobytes(), json.dumps(prompts))
+        )
+
+
+def _cached(concept: str, n: int, namespace: str):
+    """Semantic match first, then a slot-substituted template match."""
+
+    try:
+        cached = lookup(concept, n, namespace)
+    except Exception as e:
+        # Cache problems must never block generation
+        print(f"⚠️ Prompt cache unavailable: {e}")
+        return None
+
+    if cached is None:
+        try:
+            cached = gen_cache.match(concept, n, namespace)
+        except Exception as e:
+            print(f"⚠️ Template cache unavailable: {e}")
+
+    return cached
+
+
+def _remember(concept: str, n: int, prompts: list, namespace: str) -> None:
+    try:
+        store(concept, n, prompts, namespace)
+        gen_cache.remember(concept, n, prompts, namespace)
+    except Exception as e:
+        print(f"⚠️ Could not cache prompts: {e}")
+
+
+def get_or_generate(concept: str, n: int, fn, namespace: str = "default") -> list:
+    """Serve prompts from the cache, else call fn() and cache its result."""
+
+    cached = _cached(concept, n, namespace)
+    if cached is not None:
+        return cached
+
+    prompts = fn()
+
+    if len(prompts) == n:
+        _remember(concept, n, prompts, namespace)
+
+    return prompts
+
+
+def iter_or_generate(concept: str, n: int, gen_fn, namespace: str = "default"):
+    """Streaming get_or_generate: yield cached prompts, else relay gen_fn() as it yields and cache the result."""
+
+    cached = _cached(concept, n, namespace)
+    if cached is not None:
+        yield from cached
+        return
+
+    prompts = []
+    for prompt in gen_fn():
+        prompts.append(prompt)
+        yield prompt
+
+    if len(prompts) == n:
+        _remember(concept, n, prompts, namespace)
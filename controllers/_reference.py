@@ -0,0 +1,108 @@
+"""
+Reference image loading for Gemini
+Small files passed straight to types.Part.from_bytes; large photos downscaled to 1024px JPEG once
+(in memory per process, or on disk keyed by content hash for the desktop app)
+"""
+
+import io
+import os
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+from PIL import Image as PILImage, ImageOps
+
+MAX_EDGE = 1024  # Gemini only needs ~768px for reference-guided generation
+JPEG_QUALITY = 85
+
+# Formats Gemini accepts as-is, detected from the file's magic bytes
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"RIFF", "image/webp"),
+)
+
+
+def _sniff_mime(data: bytes):
+    for signature, mime in _SIGNATURES:
+        if data.startswith(signature):
+            if mime == "image/webp" and data[8:12] != b"WEBP":
+                continue
+            return mime
+    return None
+
+
+def _to_jpeg(data: bytes) -> bytes:
+    """
+    Downscale to MAX_EDGE on the long side and re-encode as JPEG (alpha flattened on white).
+    EXIF orientation is applied to the pixels first, since the re-encode drops the tag.
+    """
+
+    image = PILImage.open(io.BytesIO(data))
+    image.draft("RGB", (MAX_EDGE, MAX_EDGE))  # JPEG: decode at 1/2, 1/4, 1/8 scale directly
+    image = ImageOps.exif_transpose(image)  # phone photos: sideways pixels + Orientation tag
+    image.thumbnail((MAX_EDGE, MAX_EDGE), PILImage.LANCZOS)
+
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        flat = PILImage.new("RGB", image.size, (255, 255, 255))
+        flat.paste(image, mask=image.getchannel("A"))
+        image = flat
+
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def _needs_conversion(data: bytes) -> bool:
+    """Unsupported container (BMP, TIFF, ...) or a full-size photo."""
+    with PILImage.open(io.BytesIO(data)) as image:
+        oversized = max(image.size) > MAX_EDGE
+    return _sniff_mime(data) is None or oversized
+
+
+@lru_cache(maxsize=8)
+def _load(path: str, mtime: float, size: int) -> tuple:
+    with open(path, "rb") as f:
+        data = f.read()
+
+    mime = _sniff_mime(data)
+    if _needs_conversion(data):
+        # Unsupported container (BMP, TIFF, ...) or a full-size photo → one-off JPEG conversion
+        original = len(data)
+        data, mime = _to_jpeg(data), "image/jpeg"
+        print(f"🗜️ Reference image {original // 1024}KB → {len(data) // 1024}KB")
+
+    return data, mime
+
+
+def load_reference_image(path: str) -> tuple:
+    """Return (bytes, mime_type) for a reference image; cached until the file changes (mtime + size)."""
+    st = os.stat(path)
+    return _load(path, st.st_mtime, st.st_size)
+
+
+def prepare_reference_file(path: str, cache_dir) -> str:
+    """
+    Path of a Gemini-ready reference image: the file itself if it needs no conversion,
+    else its MAX_EDGE JPEG, written once to cache_dir/<sha256 of the source>.jpg.
+    """
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if not _needs_conversion(data):
+        return path
+
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    out = cache_dir / f"{hashlib.sha256(data).hexdigest()}.jpg"
+
+    if not out.exists():
+        jpeg = _to_jpeg(data)
+        tmp = out.with_suffix(".tmp")
+        tmp.write_bytes(jpeg)
+        os.replace(tmp, out)
+        print(f"🗜️ Reference image {len(data) // 1024}KB → {len(jpeg) // 1024}KB (cached)")
+
+    return str(out)
@@ -0,0 +1,175 @@
+"""
+Shared U²-Net background removal
+One cached ONNX Runtime session (GPU when available) → all frames inferred as a single batch
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import onnxruntime as ort
+from PIL import Image as PILImage, ImageChops
+from rembg import remove
+from rembg.sessions import sessions_class
+
+# u2netp (4.7MB) is ~3x faster than the default u2net; "isnet-general-use" for quality
+MODEL_NAME = os.environ.get("REMBG_MODEL", "u2netp")
+# Preferred accelerators first; only the ones this onnxruntime build ships are requested
+PREFERRED_PROVIDERS = ["CUDAExecutionProvider", "CoreMLExecutionProvider", "CPUExecutionProvider"]
+PROVIDERS = [p for p in PREFERRED_PROVIDERS if p in ort.get_available_providers()] or ["CPUExecutionProvider"]
+MAX_BATCH = 16
+
+# CPU-only hosts: several concurrent 2-thread runs scale better than one run using every core
+CPU_ONLY = PROVIDERS == ["CPUExecutionProvider"]
+INTRA_OP_THREADS = 2
+CPU_WORKERS = max(1, (os.cpu_count() or 1) // INTRA_OP_THREADS)
+
+# Per-model preprocessing (input size, mean, std) — matches rembg's own normalization
+_U2NET = ((320, 320), (0.485, 0.456, 0.406), (0.229, 0.224, 0.225))
+_ISNET = ((1024, 1024), (0.5, 0.5, 0.5), (1.0, 1.0, 1.0))
+MODEL_PREPROCESSING = {
+    "u2net": _U2NET,
+    "u2netp": _U2NET,
+    "u2net_human_seg": _U2NET,
+    "silueta": _U2NET,
+    "isnet-general-use": _ISNET,
+    "isnet-anime": _ISNET,
+}
+
+# CUDA: heuristic cuDNN conv algo pick — batch shapes vary per call, exhaustive search would rerun per shape
+PROVIDER_OPTIONS = {
+    "CUDAExecutionProvider": {"cudnn_conv_algo_search": "HEURISTIC"},
+}
+
+
+def _new_session():
+    """rembg session with explicit ORT options (rembg.new_session() always builds its own)."""
+
+    sess_opts = ort.SessionOptions()
+    sess_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess_opts.enable_mem_pattern = True
+    if CPU_ONLY:
+        # Cap ORT's threads per run so concurrent runs don't oversubscribe
+        sess_opts.intra_op_num_threads = INTRA_OP_THREADS
+        sess_opts.inter_op_num_threads = 1
+
+    providers = [(p, PROVIDER_OPTIONS[p]) if p in PROVIDER_OPTIONS else p for p in PROVIDERS]
+
+    session_class = next((sc for sc in sessions_class if sc.name() == MODEL_NAME), None)
+    if session_class is None:
+        raise Exception(f"Unknown rembg model: {MODEL_NAME}")
+    return session_class(MODEL_NAME, sess_opts, providers=providers)
+
+
+# Built once at import (GPU needs onnxruntime-gpu on CUDA hosts, CoreML ships with macOS wheels)
+session = _new_session()
+print(f"🧠 rembg {MODEL_NAME} on {session.inner_session.get_providers()[0]}")
+
+
+def _preprocess(frame: PILImage.Image) -> np.ndarray:
+    """Resize + normalize one frame into a (3, H, W) float32 tensor."""
+    size, mean, std = MODEL_PREPROCESSING[MODEL_NAME]
+    arr = np.asarray(frame.convert("RGB").resize(size, PILImage.LANCZOS), dtype=np.float32)
+    arr = arr / max(float(arr.max()), 1e-6)
+    arr = (arr - np.array(mean, dtype=np.float32)) / np.array(std, dtype=np.float32)
+    return arr.transpose((2, 0, 1))
+
+
+def _run_model(batch: np.ndarray) -> np.ndarray:
+    """Run the model on an (N, 3, H, W) batch, return (N, H, W) predictions."""
+    inner = session.inner_session
+    input_name = inner.get_inputs()[0].name
+    return inner.run(None, {input_name: batch})[0][:, 0, :, :]
+
+
+def _supports_batching() -> bool:
+    """Some exported models pin the batch dimension to 1."""
+    batch_dim = session.inner_session.get_inputs()[0].shape[0]
+    return not isinstance(batch_dim, int) or batch_dim != 1
+
+
+def _mask(frame: PILImage.Image, pred: np.ndarray) -> PILImage.Image:
+    """Scale a prediction to the frame size (times any alpha the frame already has)."""
+    lo, hi = float(pred.min()), float(pred.max())
+    pred = (pred - lo) / max(hi - lo, 1e-6)
+    mask = PILImage.fromarray((pred * 255).astype(np.uint8), mode="L")
+    mask = mask.resize(frame.size, PILImage.LANCZOS)
+
+    if "A" in frame.getbands():
+        mask = ImageChops.multiply(frame.getchannel("A"), mask)
+    return mask
+
+
+def _apply_mask(frame: PILImage.Image, pred: np.ndarray) -> PILImage.Image:
+    """Cut the subject out of one frame (always returns RGBA)."""
+    # One RGB copy with the matte as its alpha band — no blank canvas, no composite pass
+    cutout = frame.convert("RGB")
+    cutout.putalpha(_mask(frame, pred))
+    return cutout
+
+
+def _apply_masks(frames: list, preds) -> list:
+    """
+    Cut out same-size frames into one contiguous (N, H, W, 4) buffer.
+    RGB and alpha are written straight into their slots; the returned images share the buffer.
+    """
+    width, height = frames[0].size
+    buffer = np.empty((len(frames), height, width, 4), dtype=np.uint8)
+
+    for slot, frame, pred in zip(buffer, frames, preds):
+        slot[..., :3] = np.asarray(frame if frame.mode == "RGB" else frame.convert("RGB"))
+        slot[..., 3] = np.asarray(_mask(frame, pred))
+
+    return [PILImage.fromarray(slot, "RGBA") for slot in buffer]
+
+
+def has_transparent_border(frame: PILImage.Image, max_opaque: float = 0.05) -> bool:
+    """True when almost no border pixels are opaque, i.e. the background is already cut out."""
+    if frame.mode not in ("RGBA", "LA", "PA"):
+        return False
+
+    alpha = np.asarray(frame.getchannel("A"))
+    border = np.concatenate([alpha[0, :], alpha[-1, :], alpha[:, 0], alpha[:, -1]])
+    return (border > 250).mean() < max_opaque
+
+
+def batch_remove(frames: list) -> list:
+    """Remove backgrounds from all frames in as few model invocations as possible."""
+
+    if not frames:
+        return []
+
+    workers = min(len(frames), CPU_WORKERS if CPU_ONLY else os.cpu_count() or 1)
+
+    if MODEL_NAME not in MODEL_PREPROCESSING:
+        # Unknown preprocessing: let rembg handle each frame with the shared session (RGBA out)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda f: remove(f, session=session), frames))
+
+    batch = np.stack([_preprocess(f) for f in frames])
+
+    if not _supports_batching():
+        chunk = 1  # fixed batch size: one frame per run
+    elif CPU_ONLY:
+        chunk = min(MAX_BATCH, -(-len(frames) // workers))  # one chunk per worker
+    else:
+        chunk, workers = MAX_BATCH, 1  # GPU: sequential big batches, chunked so ISNet at 1024² fits
+
+    chunks = [batch[i:i + chunk] for i in range(0, len(batch), chunk)]
+
+    if len(chunks) == 1:
+        preds = _run_model(chunks[0])
+    else:
+        # Concurrent runs on the shared session (ORT releases the GIL)
+        with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            preds = np.concatenate(list(pool.map(_run_model, chunks)))
+
+    if len(frames) > 1 and len({frame.size for frame in frames}) == 1:
+        return _apply_masks(frames, preds)
+    return [_apply_mask(frame, pred) for frame, pred in zip(frames, preds)]
+
+
+def warm_up() -> None:
+    """Run one tiny frame through the model so ORT's first-run kernel/cuDNN setup isn't paid by a request."""
+    batch_remove([PILImage.new("RGB", (64, 64))])
+    print("🔥 rembg session warmed up")
@@ -0,0 +1,54 @@
+"""
+Shared SQLite connections for the task store and prompt caches
+One connection per thread per database, opened on first use and reused;
+schema (and WAL mode, which persists in the file) set up once per process
+"""
+
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+
+
+class Database:
+    def __init__(self, path, schema: str, wal: bool = False, timeout: float = 10):
+        self.path = Path(path)
+        self.schema = schema
+        self.wal = wal
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ready = False
+        self._connections = []  # every thread's connection, for close()
+
+    def _setup(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(sqlite3.connect(self.path, timeout=self.timeout)) as conn:
+            if self.wal:
+                # WAL: readers don't block the writer (a property of the file → set once)
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.schema)
+        self._ready = True
+
+    def connect(self) -> sqlite3.Connection:
+        """This thread's connection; use as `with db.connect() as conn:` (commits, stays open)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._lock:
+                if not self._ready:
+                    self._setup()
+                # Only ever used by this thread; check_same_thread off just so close() can run at shutdown
+                conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+                if self.wal:
+                    conn.execute("PRAGMA synchronous=NORMAL")  # per connection; durable enough for caches
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Close every thread's connection (app shutdown); later calls reconnect."""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._local = threading.local()
@@ -0,0 +1,86 @@
+"""
+Task store for two-step video requests
+task_id → output paths in SQLite (WAL) → shared by every Uvicorn worker on the box, entries expire
+Time-ordered (UUIDv7) task_ids → the table is capped at MAX_TASKS, oldest rows evicted first
+"""
+
+import os
+import json
+import time
+import uuid
+from pathlib import Path
+
+from controllers._sqlite import Database
+
+STORE_DIR = Path(os.environ.get("TASK_STORE_DIR", "./outputs"))
+DB_PATH = STORE_DIR / "tasks.sqlite3"
+
+DEFAULT_TTL = 3600  # seconds a generated task stays fetchable
+MAX_TASKS = int(os.environ.get("TASK_STORE_MAX", 10_000))  # hard bound on rows (and files on disk)
+
+
+def new_task_id() -> str:
+    """UUIDv7 hex: 48-bit ms timestamp first, so ids sort by creation time."""
+    if hasattr(uuid, "uuid7"):  # Python 3.14+
+        return uuid.uuid7().hex
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76  # version 7
+    value = value & ~(0x3 << 62) | 0x2 << 62  # RFC 4122 variant
+    return uuid.UUID(int=value).hex
+
+
+# Per-thread connections (the reaper's and request threadpool's), schema + WAL set up on first use
+_db = Database(
+    DB_PATH,
+    """CREATE TABLE IF NOT EXISTS tasks (
+        task_id TEXT PRIMARY KEY,
+        paths TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )""",
+    wal=True,
+)
+_connect = _db.connect
+close = _db.close
+
+
+def put(task_id: str, paths: dict, ttl: int = DEFAULT_TTL) -> list:
+    """
+    Store (or replace) a task's paths for ttl seconds.
+    Returns the paths dicts of the oldest tasks evicted to stay under MAX_TASKS (for file cleanup).
+    """
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO tasks (task_id, paths, expires_at) VALUES (?, ?, ?)",
+            (task_id, json.dumps(paths), time.time() + ttl)
+        )
+        # task_id is the primary key and time-ordered → oldest rows come straight off the index
+        rows = conn.execute(
+            """DELETE FROM tasks WHERE task_id IN (
+                SELECT task_id FROM tasks ORDER BY task_id
+                LIMIT max(0, (SELECT count(*) FROM tasks) - ?)
+            ) RETURNING paths""",
+            (MAX_TASKS,)
+        ).fetchall()
+    return [json.loads(paths) for (paths,) in rows]
+
+
+def get(task_id: str):
+    """Return a task's paths, or None if unknown or expired."""
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT paths FROM tasks WHERE task_id = ? AND expires_at > ?",
+            (task_id, time.time())
+        ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def pop_expired() -> list:
+    """
+    Remove expired tasks and return their paths dicts (for file cleanup) — one statement,
+    so a row refreshed by a concurrent put() is either returned and gone, or kept.
+    """
+    with _connect() as conn:
+        rows = conn.execute(
+            "DELETE FROM tasks WHERE expires_at <= ? RETURNING paths", (time.time(),)
+        ).fetchall()
+    return [json.loads(paths) for (paths,) in rows]
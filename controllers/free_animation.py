@@ -4,36 +4,40 @@ Uses GPT-4o-mini for frame prompts → Pollinations.ai (FREE) for images → rem
 """
 
 import os
-import io
 import time
+import queue
 import random
-import requests
+import threading
+import hashlib
+import tempfile
+from pathlib import Path
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import httpx
 import urllib.parse
-from PIL import Image as PILImage
+from PIL import Image as PILImage, ImageFile
 from openai import OpenAI
-from rembg import remove
 from dotenv import load_dotenv
 
+from controllers._http import client as http
+from controllers._prompt_cache import iter_or_generate
+from controllers._rembg import MAX_BATCH, batch_remove
+from controllers._webp import save_animated_webp
+
 load_dotenv()
 
 # WhatsApp sticker specs
 STICKER_SIZE = 512
 MAX_FILE_SIZE = 500 * 1024  # 500KB
 
-openai_client = OpenAI()
-
+# Generated-frame cache (set STICKER_NO_CACHE=1 to force fresh downloads)
+CACHE_DIR = Path(os.environ.get("STICKER_CACHE", "./.sticker_cache"))
+FRAME_CACHE_ENABLED = os.environ.get("STICKER_NO_CACHE") != "1"
+FRAME_CACHE_MAX = int(os.environ.get("STICKER_CACHE_MAX_FRAMES", 500))  # least recently used PNGs beyond this are deleted
 
-def generate_frame_prompts(concept: str, num_frames: int = 5) -> list:
-    """Use GPT-4o-mini to generate detailed sequential frame prompts."""
-
-    print(f"📝 Generating {num_frames} detailed frame prompts...")
+openai_client = OpenAI()
 
-    response = openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": """You are an expert animation prompt generator for AI image generation. Given a concept, generate highly detailed sequential frame descriptions for a short animation/transformation.
+FRAME_PROMPT_SYSTEM = """You are an expert animation prompt generator for AI image generation. Given a concept, generate highly detailed sequential frame descriptions for a short animation/transformation.
 
 Rules:
 - Output ONLY the prompts, one per line, numbered
@@ -58,23 +62,86 @@ Example for "cat freezing into ice" (5 frames):
 4. Same kawaii chibi cat mostly frozen, body 70% crystalline ice blue, only face and chest still showing orange fur, frozen pose with paws up, large ice crystals on ears and tail, snowflakes swirling around, icicles hanging from arms, expression frozen in cute surprise, kawaii chibi style, cute cartoon sticker, bold black outlines, cel-shaded, vibrant colors, simple clean design, centered composition, solid white background, no text
 
 5. Same kawaii chibi cat now completely transformed into beautiful ice sculpture, entire body crystalline ice blue with white highlights, frozen in cute pose with paws up, eyes now sparkly ice gems with star reflections, translucent icy texture throughout, snowflakes and ice crystals floating around, small frozen breath puff near mouth, standing on tiny ice puddle, maintaining same cute chibi proportions, kawaii chibi style, cute cartoon sticker, bold black outlines, cel-shaded, vibrant colors, simple clean design, centered composition, solid white background, no text"""
+
+
+def generate_frame_prompts(concept: str, num_frames: int = 5) -> list:
+    """Detailed sequential frame prompts, served from the semantic cache when possible."""
+
+    return list(stream_frame_prompts(concept, num_frames))
+
+
+def stream_frame_prompts(concept: str, num_frames: int = 5):
+    """Yield frame prompts one by one (cached, or as GPT finishes each line)."""
+
+    return iter_or_generate(
+        concept,
+        num_frames,
+        lambda: _stream_request_frame_prompts(concept, num_frames),
+        namespace="free_animation"
+    )
+
+
+def _parse_prompt_line(line: str) -> str:
+    return line.split('. ', 1)[1] if '. ' in line else line
+
+
+def _stream_request_frame_prompts(concept: str, num_frames: int):
+    """Use GPT-4o-mini (streamed) to generate detailed sequential frame prompts."""
+
+    print(f"📝 Generating {num_frames} detailed frame prompts...")
+
+    stream = openai_client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {
+                "role": "system",
+                "content": FRAME_PROMPT_SYSTEM
             },
             {
                 "role": "user",
                 "content": f"Generate {num_frames} highly detailed frame prompts for: {concept}"
             }
         ],
-        temperature=0.7
+        temperature=0.7,
+        stream=True
     )
 
-    lines = response.choices[0].message.content.strip().split('\n')
-    prompts = [line.split('. ', 1)[1] if '. ' in line else line for line in lines if line.strip()]
-
-    print(f"✅ Generated {len(prompts)} frame prompts:")
-    for i, p in enumerate(prompts):
-        print(f"   Frame {i + 1}: {p[:70]}...")
-
-    return prompts
+    # Yield each numbered line as soon as its newline arrives
+    buffer = ""
+    count = 0
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        buffer += chunk.choices[0].delta.content or ""
+
+        while "\n" in buffer:
+            line, buffer = buffer.split("\n", 1)
+            if line.strip():
+                count += 1
+                prompt = _parse_prompt_line(line)
+                print(f"   Frame {count}: {prompt[:70]}...")
+                yield prompt
+
+    if buffer.strip():
+        count += 1
+        prompt = _parse_prompt_line(buffer.strip())
+        print(f"   Frame {count}: {prompt[:70]}...")
+        yield prompt
+
+    print(f"✅ Generated {count} frame prompts")
+
+
+def _prune_frame_cache() -> None:
+    """Keep only the FRAME_CACHE_MAX most recently used frame PNGs."""
+    entries = []
+    for path in CACHE_DIR.glob("*.png"):
+        try:
+            entries.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            pass
+    entries.sort(reverse=True)
+    for _, path in entries[FRAME_CACHE_MAX:]:
+        path.unlink(missing_ok=True)
 
 
 def generate_frame_pollinations(prompt: str, frame_index: int, seed: int = None) -> PILImage.Image:
@@ -97,72 +164,124 @@ centered subject, full body visible, no cropping"""
         "nologo": "true",
     }
 
+    key = hashlib.sha256(f"{full_prompt}|{seed}".encode()).hexdigest()
+    cache_file = CACHE_DIR / f"{key}.png"
+
+    if FRAME_CACHE_ENABLED:
+        try:
+            image = PILImage.open(cache_file)
+            image.load()  # decode on this worker thread, not later on the consumer
+            os.utime(cache_file)  # mtime = last use, for _prune_frame_cache
+            print(f"   ♻️ Frame {frame_index + 1} loaded from cache")
+            return image
+        except FileNotFoundError:  # not cached (or pruned meanwhile) → download
+            pass
+
     encoded_prompt = urllib.parse.quote(full_prompt)
     url = f"https://image.pollinations.ai/prompt/{encoded_prompt}"
 
     print(f"   🎨 Generating frame {frame_index + 1} (seed: {seed})...")
 
     try:
-        response = requests.get(url, params=params, timeout=120)
-        response.raise_for_status()
-        image = PILImage.open(io.BytesIO(response.content))
+        with http.stream("GET", url, params=params) as response:
+            response.raise_for_status()
+
+            # Decode incrementally while bytes arrive, teeing chunks into a unique temp file
+            # (same prompt + seed can be fetched by two threads at once)
+            parser = ImageFile.Parser()
+            tmp_file = None
+            if FRAME_CACHE_ENABLED:
+                CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                tmp_file = tempfile.NamedTemporaryFile(dir=CACHE_DIR, prefix=".", suffix=".tmp", delete=False)
+
+            try:
+                with tmp_file or nullcontext() as f:
+                    for chunk in response.iter_bytes():
+                        parser.feed(chunk)
+                        if f:
+                            f.write(chunk)
+
+                image = parser.close()
+
+                if tmp_file:
+                    # Atomic rename so concurrent runs never read a partial PNG
+                    os.replace(tmp_file.name, cache_file)
+            finally:
+                if tmp_file:
+                    try:
+                        os.remove(tmp_file.name)  # only still there if the stream or decode failed
+                    except FileNotFoundError:
+                        pass
+
+        if tmp_file:
+            _prune_frame_cache()
+
         print(f"   ✅ Frame {frame_index + 1} generated!")
         return image
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise Exception(f"Failed to generate frame {frame_index + 1}: {e}")
 
 
-def create_animated_webp(frames: list, output_path: str = "sticker.webp", fps: int = 4) -> str:
+def create_animated_webp(frames: list, output_path: str = "sticker.webp", fps: int = 4,
+                         remove_background: bool = True) -> str:
     """Create animated WebP sticker from multiple frames with background removal."""
 
     print("🎬 Creating animated WebP...")
 
-    processed_frames = []
-    for i, frame in enumerate(frames):
-        # Remove background using rembg
-        print(f"   🔧 Removing background from frame {i + 1}...")
-        frame = remove(frame)
+    if remove_background:
+        # Resize first so rembg post-processes 512² instead of the native resolution
+        frames = [frame.resize((STICKER_SIZE, STICKER_SIZE), PILImage.LANCZOS) for frame in frames]
 
-        # Convert and resize
-        frame = frame.convert("RGBA")
-        frame = frame.resize((STICKER_SIZE, STICKER_SIZE), PILImage.LANCZOS)
-        processed_frames.append(frame)
+        # Remove backgrounds (all frames in one batched U²-Net pass)
+        print(f"   🔧 Removing background from {len(frames)} frames...")
+        processed_frames = batch_remove(frames)
+    else:
+        # Frames already cut out (pipelined path)
+        processed_frames = frames
 
     # Create smooth loop: 1→2→3→4→5→4→3→2→1
     frames_loop = processed_frames + processed_frames[-2:0:-1]
 
     duration = 1000 // fps
 
-    frames_loop[0].save(
-        output_path,
-        save_all=True,
-        append_images=frames_loop[1:],
-        duration=duration,
-        loop=0,
-        format="WEBP",
-        quality=85,
-        method=6
-    )
-
-    if os.path.getsize(output_path) > MAX_FILE_SIZE:
-        print("⚠️ Compressing to meet WhatsApp size limit...")
-        frames_loop[0].save(
-            output_path,
-            save_all=True,
-            append_images=frames_loop[1:],
-            duration=duration,
-            loop=0,
-            format="WEBP",
-            quality=60,
-            method=6
-        )
+    save_animated_webp(frames_loop, output_path, duration, max_size=MAX_FILE_SIZE)
 
     size_kb = os.path.getsize(output_path) / 1024
     print(f"✅ Saved: {output_path} ({size_kb:.1f} KB)")
     return output_path
 
 
+def _cutout_worker(frame_q: queue.Queue, cutouts: list, errors: list) -> None:
+    """
+    Consumer stage: resize + remove background as frames arrive. Everything already queued
+    after each blocking get() (up to MAX_BATCH) goes through one batched rembg pass.
+    """
+
+    done = False
+    while not done:
+        items = [frame_q.get()]
+        while len(items) < MAX_BATCH:
+            try:
+                items.append(frame_q.get_nowait())
+            except queue.Empty:
+                break
+        if None in items:  # sentinel: finish what came before it, then stop
+            items = items[:items.index(None)]
+            done = True
+        if not items:
+            continue
+
+        indices = [index for index, _ in items]
+        try:
+            frames = [frame.resize((STICKER_SIZE, STICKER_SIZE), PILImage.LANCZOS) for _, frame in items]
+            for index, cutout in zip(indices, batch_remove(frames)):
+                cutouts[index] = cutout
+            print(f"   🔧 Background removed from frame(s) {', '.join(str(i + 1) for i in indices)}")
+        except Exception as e:
+            errors.append(e)
+
+
 def generate_animated_sticker(
     concept: str,
     num_frames: int,
@@ -177,6 +296,9 @@ def generate_animated_sticker(
     Flow:
     concept → GPT generates N prompts → Pollinations generates N images
     → background removed → combined into animated WebP
+
+    base_seed=None derives a deterministic seed from the concept (cache-friendly);
+    pass an explicit random int for a different variation of the same concept.
     """
 
     # 🔒 Safety clamp (allow up to 15 frames)
@@ -190,38 +312,63 @@ def generate_animated_sticker(
     print(f"🎞 FPS: {fps}")
     print(f"{'='*60}\n")
 
-    # Base seed for style consistency
+    # Base seed for style consistency; derived from the concept so repeat runs hit the frame cache
     if base_seed is None:
-        base_seed = random.randint(1, 99999)
+        base_seed = int(hashlib.sha256(concept.encode()).hexdigest()[:8], 16) % 99999
     print(f"🎲 Base seed: {base_seed}\n")
 
-    # 1️⃣ Generate frame prompts
-    prompts = generate_frame_prompts(concept, num_frames)
-
-    if len(prompts) != num_frames:
-        raise Exception(
-            f"Expected {num_frames} prompts, got {len(prompts)}"
-        )
-
-    # 2️⃣ Generate frames (NO delay)
-    frames = []
-    for i, prompt in enumerate(prompts):
-        frame_seed = base_seed + i
-        frame = generate_frame_pollinations(
-            prompt=prompt,
-            frame_index=i,
-            seed=frame_seed
-        )
-        frames.append(frame)
-
-        if save_raw_frames:
+    frames = [None] * num_frames
+    cutouts = [None] * num_frames
+    errors = []
+
+    frame_q = queue.Queue()
+    consumer = threading.Thread(target=_cutout_worker, args=(frame_q, cutouts, errors), daemon=True)
+    consumer.start()
+
+    # Pipeline: streamed GPT prompts → concurrent Pollinations downloads → rembg consumer thread
+    try:
+        with ThreadPoolExecutor(max_workers=num_frames) as executor:
+            # 1️⃣ Submit each frame the moment its prompt line arrives
+            futures = {}
+            prompt_count = 0
+            for i, prompt in enumerate(stream_frame_prompts(concept, num_frames)):
+                prompt_count += 1
+                if i < num_frames:
+                    future = executor.submit(
+                        generate_frame_pollinations,
+                        prompt=prompt,
+                        frame_index=i,
+                        seed=base_seed + i
+                    )
+                    futures[future] = i
+
+            if prompt_count != num_frames:
+                raise Exception(
+                    f"Expected {num_frames} prompts, got {prompt_count}"
+                )
+
+            # 2️⃣ Hand finished frames to the cutout thread
+            for future in as_completed(futures):
+                index = futures[future]
+                frames[index] = future.result()
+                frame_q.put((index, frames[index]))
+    finally:
+        frame_q.put(None)
+        consumer.join()
+
+    if errors:
+        raise Exception(f"Background removal failed: {errors[0]}")
+
+    if save_raw_frames:
+        for i, frame in enumerate(frames):
             frame.save(f"frame_{i + 1}_raw.png")
 
     # 3️⃣ Create animated WebP
     output = create_animated_webp(
-        frames=frames,
+        frames=cutouts,
         output_path=output_file,
-        fps=fps
+        fps=fps,
+        remove_background=False
     )
 
     print(f"\n{'='*60}")
@@ -4,13 +4,16 @@ No API key required! Unlimited generations!
 Uses FLUX model for high-quality sticker generation
 """
 
-import os
 import io
-import math
-import requests
+import httpx
 import urllib.parse
+import numpy as np
 from PIL import Image as PILImage
 
+from controllers._animation import place, pulse_frames, rotated_frames, translate_frames, vertical_offsets, wave
+from controllers._http import client as http
+from controllers._webp import save_animated_webp
+
 # WhatsApp sticker specs
 STICKER_SIZE = 512
 MAX_FILE_SIZE = 500 * 1024  # 500KB for animated
@@ -51,7 +54,7 @@ sticker art, no text, high quality"""
         print(f"   Describe the person/style in your prompt instead.")
 
     try:
-        response = requests.get(url, params=params, timeout=120)
+        response = http.get(url, params=params)
         response.raise_for_status()
 
         # Convert to PIL Image
@@ -59,27 +62,50 @@ sticker art, no text, high quality"""
         print("✓ Sticker generated!")
         return image
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise Exception(f"Failed to generate image: {e}")
 
 
 def remove_white_background(image: PILImage.Image, threshold: int = 240) -> PILImage.Image:
     """Remove white background and make it transparent."""
-    image = image.convert("RGBA")
-    pixels = image.load()
+    arr = np.array(image.convert("RGBA"))
+
+    mask = (arr[..., 0] > threshold) & (arr[..., 1] > threshold) & (arr[..., 2] > threshold)
+    arr[mask] = (255, 255, 255, 0)  # Transparent
+
+    return PILImage.fromarray(arr, "RGBA")
+
+
+def _translate_frames(image: PILImage.Image, animation: str, num_frames: int) -> list:
+    """Float/bounce/static: frames differ only in y, so slice one RGBA array into a NumPy batch."""
+
+    x0 = (STICKER_SIZE - image.width) // 2
+    y0 = (STICKER_SIZE - image.height) // 2
+    positions = [(x0, y0 + dy) for dy in vertical_offsets(animation, num_frames)]
 
-    for y in range(image.height):
-        for x in range(image.width):
-            r, g, b, a = pixels[x, y]
-            if r > threshold and g > threshold and b > threshold:
-                pixels[x, y] = (255, 255, 255, 0)  # Transparent
+    return translate_frames(image, positions, STICKER_SIZE)
 
-    return image
+
+def _transform_frames(image: PILImage.Image, animation: str, num_frames: int) -> list:
+    """Pulse/wiggle: PIL resize/rotate, rendered once per distinct size/angle and shared between frames."""
+
+    if animation == "pulse":
+        # Pulsing/breathing effect
+        sizes = (STICKER_SIZE * (0.9 + 0.1 * wave(num_frames))).astype(int)
+        return pulse_frames(image, sizes, STICKER_SIZE)
+
+    if animation == "wiggle":
+        # Rotation wiggle
+        return rotated_frames(image, wave(num_frames) * 8, size=STICKER_SIZE)
+
+    # unknown → static
+    center = ((STICKER_SIZE - image.width) // 2, (STICKER_SIZE - image.height) // 2)
+    return [place(image, center, STICKER_SIZE)] * num_frames
 
 
 def create_animated_webp(image: PILImage.Image, animation: str = "float",
-                         output_path: str = "sticker.webp") -> str:
-    """Create animated WebP sticker for WhatsApp."""
+                         output_path="sticker.webp"):
+    """Create animated WebP sticker for WhatsApp (output_path: file path or binary file object)."""
 
     # Resize to 512x512
     image = image.resize((STICKER_SIZE, STICKER_SIZE), PILImage.LANCZOS)
@@ -88,73 +114,17 @@ def create_animated_webp(image: PILImage.Image, animation: str = "float",
     image = remove_white_background(image)
 
     # Animation settings
-    frames = []
     num_frames = 20
     duration = 67  # ~15fps
 
-    for i in range(num_frames):
-        t = i / num_frames
-        frame = PILImage.new("RGBA", (STICKER_SIZE, STICKER_SIZE), (0, 0, 0, 0))
-
-        if animation == "float":
-            offset_y = int(math.sin(t * 2 * math.pi) * 15)
-            pos = ((STICKER_SIZE - image.width) // 2,
-                   (STICKER_SIZE - image.height) // 2 + offset_y)
-        elif animation == "bounce":
-            offset_y = int(abs(math.sin(t * 2 * math.pi)) * 25)
-            pos = ((STICKER_SIZE - image.width) // 2,
-                   (STICKER_SIZE - image.height) // 2 - offset_y)
-        elif animation == "pulse":
-            scale = 0.9 + 0.1 * math.sin(t * 2 * math.pi)
-            new_size = int(STICKER_SIZE * scale)
-            scaled = image.resize((new_size, new_size), PILImage.LANCZOS)
-            pos = ((STICKER_SIZE - new_size) // 2, (STICKER_SIZE - new_size) // 2)
-            frame.paste(scaled, pos, scaled)
-            frames.append(frame)
-            continue
-        elif animation == "wiggle":
-            angle = math.sin(t * 2 * math.pi) * 8
-            rotated = image.rotate(angle, resample=PILImage.BICUBIC, expand=False)
-            pos = ((STICKER_SIZE - rotated.width) // 2,
-                   (STICKER_SIZE - rotated.height) // 2)
-            frame.paste(rotated, pos, rotated)
-            frames.append(frame)
-            continue
-        else:  # static
-            pos = ((STICKER_SIZE - image.width) // 2,
-                   (STICKER_SIZE - image.height) // 2)
-
-        frame.paste(image, pos, image)
-        frames.append(frame)
-
-    # Save as animated WebP
-    frames[0].save(
-        output_path,
-        save_all=True,
-        append_images=frames[1:],
-        duration=duration,
-        loop=0,
-        format="WEBP",
-        quality=85,
-        method=6
-    )
-
-    # Check file size & compress if needed
-    if os.path.getsize(output_path) > MAX_FILE_SIZE:
-        print("⚠ Compressing to meet WhatsApp size limit...")
-        frames[0].save(
-            output_path,
-            save_all=True,
-            append_images=frames[1:],
-            duration=duration,
-            loop=0,
-            format="WEBP",
-            quality=60,
-            method=6
-        )
-
-    size_kb = os.path.getsize(output_path) / 1024
-    print(f"✓ Saved: {output_path} ({size_kb:.1f} KB)")
+    if animation in ("float", "bounce", "static"):
+        frames = _translate_frames(image, animation, num_frames)
+    else:
+        frames = _transform_frames(image, animation, num_frames)
+
+    # Save as animated WebP (compresses further only if over the size limit)
+    size_kb = save_animated_webp(frames, output_path, duration, max_size=MAX_FILE_SIZE) / 1024
+    print(f"✓ Saved: {output_path if isinstance(output_path, str) else 'in memory'} ({size_kb:.1f} KB)")
     return output_path
 
 
@@ -4,20 +4,26 @@ Uses GPT-4o-mini for frame prompts → Gemini for image generation → rembg for
 """
 
 import os
+from functools import lru_cache
 import io
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from google import genai
 from google.genai import types
 from PIL import Image as PILImage
 from openai import OpenAI
-from rembg import remove
 from dotenv import load_dotenv
 
+from controllers._prompt_cache import get_or_generate
+from controllers._rembg import batch_remove
+from controllers._reference import load_reference_image
+from controllers._webp import save_animated_webp
+
 load_dotenv()
 
 # ============== CONFIGURATION ==============
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 MODEL = "gemini-2.0-flash-exp-image-generation"
+GEMINI_MAX_WORKERS = 2  # Concurrent frame requests (rate limit friendly)
 
 # WhatsApp sticker specs
 STICKER_SIZE = 512
@@ -26,7 +32,24 @@ MAX_FILE_SIZE = 500 * 1024  # 500KB
 openai_client = OpenAI()
 
 
+@lru_cache(maxsize=1)
+def _client() -> genai.Client:
+    """One Gemini client per process, built on first use (a missing key won't break imports)."""
+    return genai.Client(api_key=GEMINI_API_KEY)
+
+
 def generate_frame_prompts(concept: str, num_frames: int = 3) -> list:
+    """Detailed sequential frame prompts, served from the semantic cache when possible."""
+
+    return get_or_generate(
+        concept,
+        num_frames,
+        lambda: _request_frame_prompts(concept, num_frames),
+        namespace="gemini_animation"
+    )
+
+
+def _request_frame_prompts(concept: str, num_frames: int) -> list:
     """Use GPT-4o-mini to generate detailed sequential frame prompts."""
 
     print(f"📝 Generating {num_frames} detailed frame prompts...")
@@ -79,8 +102,6 @@ Example for "cat freezing into ice" (3 frames):
 def generate_sticker_frame(prompt: str, frame_index: int, reference_image_path: str = None) -> PILImage.Image:
     """Generate a single sticker frame using Gemini API."""
 
-    client = genai.Client(api_key=GEMINI_API_KEY)
-
     full_prompt = f"""Create a sticker image with these EXACT requirements:
 
 IMAGE REQUIREMENTS:
@@ -99,17 +120,15 @@ IMPORTANT: Use a plain solid white background. Do not use checkered or patterned
     contents = [full_prompt]
 
     if reference_image_path and os.path.exists(reference_image_path):
-        ref_image = PILImage.open(reference_image_path)
-        img_buffer = io.BytesIO()
-        ref_image.save(img_buffer, format='JPEG')
-        img_bytes = img_buffer.getvalue()
-        contents.append(types.Part.from_bytes(data=img_bytes, mime_type="image/jpeg"))
+        # Read once and cached across frames: original bytes if Gemini-ready, else an upright 1024px JPEG
+        img_bytes, mime_type = load_reference_image(reference_image_path)
+        contents.append(types.Part.from_bytes(data=img_bytes, mime_type=mime_type))
         if frame_index == 0:
             print(f"   📷 Using reference image: {reference_image_path}")
 
     print(f"   🎨 Generating frame {frame_index + 1}...")
 
-    response = client.models.generate_content(
+    response = _client().models.generate_content(
         model=MODEL,
         contents=contents,
         config=types.GenerateContentConfig(
@@ -121,6 +140,7 @@ IMPORTANT: Use a plain solid white background. Do not use checkered or patterned
         if hasattr(part, 'inline_data') and part.inline_data is not None:
             image_data = part.inline_data.data
             pil_image = PILImage.open(io.BytesIO(image_data))
+            pil_image.load()  # decode now and release the response buffer
             print(f"   ✅ Frame {frame_index + 1} generated!")
             return pil_image
 
@@ -132,45 +152,19 @@ def create_animated_webp(frames: list, output_path: str = "sticker.webp", fps: i
 
     print("🎬 Creating animated WebP...")
 
-    processed_frames = []
-    for i, frame in enumerate(frames):
-        # Remove background using rembg
-        print(f"   🔧 Removing background from frame {i + 1}...")
-        frame = remove(frame)
+    # Resize first so rembg post-processes 512² instead of the native resolution
+    frames = [frame.resize((STICKER_SIZE, STICKER_SIZE), PILImage.LANCZOS) for frame in frames]
 
-        # Convert and resize
-        frame = frame.convert("RGBA")
-        frame = frame.resize((STICKER_SIZE, STICKER_SIZE), PILImage.LANCZOS)
-        processed_frames.append(frame)
+    # Remove backgrounds (all frames in one batched U²-Net pass)
+    print(f"   🔧 Removing background from {len(frames)} frames...")
+    processed_frames = batch_remove(frames)
 
     # Create smooth loop: 1→2→3→2→1
     frames_loop = processed_frames + processed_frames[-2:0:-1]
 
     duration = 1000 // fps
 
-    frames_loop[0].save(
-        output_path,
-        save_all=True,
-        append_images=frames_loop[1:],
-        duration=duration,
-        loop=0,
-        format="WEBP",
-        quality=85,
-        method=6
-    )
-
-    if os.path.getsize(output_path) > MAX_FILE_SIZE:
-        print("⚠️ Compressing to meet WhatsApp size limit...")
-        frames_loop[0].save(
-            output_path,
-            save_all=True,
-            append_images=frames_loop[1:],
-            duration=duration,
-            loop=0,
-            format="WEBP",
-            quality=60,
-            method=6
-        )
+    save_animated_webp(frames_loop, output_path, duration, max_size=MAX_FILE_SIZE)
 
     size_kb = os.path.getsize(output_path) / 1024
     print(f"✅ Saved: {output_path} ({size_kb:.1f} KB)")
@@ -196,18 +190,19 @@ def generate_animated_sticker(
     # Step 1: Generate detailed prompts with GPT
     prompts = generate_frame_prompts(concept, num_frames)
 
-    # Step 2: Generate each frame with Gemini
+    # Step 2: Generate frames with Gemini (2 in flight to respect rate limits)
     print(f"\n🎨 Generating {len(prompts)} frames with Gemini...\n")
-    frames = []
-    for i, prompt in enumerate(prompts):
-        if i > 0:
-            print("   ⏳ Waiting 5s...")
-            time.sleep(5)
-
-        frame = generate_sticker_frame(prompt, i, reference_image)
-        frames.append(frame)
-
-        if save_raw_frames:
+    frames = [None] * len(prompts)
+    with ThreadPoolExecutor(max_workers=GEMINI_MAX_WORKERS) as executor:
+        futures = {
+            executor.submit(generate_sticker_frame, prompt, i, reference_image): i
+            for i, prompt in enumerate(prompts)
+        }
+        for future in as_completed(futures):
+            frames[futures[future]] = future.result()
+
+    if save_raw_frames:
+        for i, frame in enumerate(frames):
             frame.save(f"frame_{i + 1}_raw.png")
             print(f"   💾 Saved: frame_{i + 1}_raw.png")
 
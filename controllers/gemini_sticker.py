@@ -4,14 +4,19 @@ Uses Nano Banana (gemini-2.5-flash-image) for cost efficiency (~$0.039/image)
 """
 
 import os
+from functools import lru_cache
 import io
-import math
 import base64
+import numpy as np
 from google import genai
 from google.genai import types
 from PIL import Image as PILImage
 from dotenv import load_dotenv
 
+from controllers._animation import place, pulse_frames, rotated_frames, translate_frames, vertical_offsets, wave
+from controllers._reference import load_reference_image
+from controllers._webp import save_animated_webp
+
 load_dotenv()
 
 # ============== CONFIGURATION ==============
@@ -23,11 +28,15 @@ STICKER_SIZE = 512
 MAX_FILE_SIZE = 500 * 1024  # 500KB for animated
 
 
+@lru_cache(maxsize=1)
+def _client() -> genai.Client:
+    """One Gemini client per process, built on first use (a missing key won't break imports)."""
+    return genai.Client(api_key=GEMINI_API_KEY)
+
+
 def generate_sticker(prompt: str, reference_image_path: str = None) -> PILImage.Image:
     """Generate a sticker image using Gemini API."""
 
-    client = genai.Client(api_key=GEMINI_API_KEY)
-
     # Build sticker-optimized prompt
     sticker_prompt = f"""Create a kawaii-style sticker with these requirements:
 - Style: Cute, chibi, cartoon sticker design
@@ -40,19 +49,14 @@ def generate_sticker(prompt: str, reference_image_path: str = None) -> PILImage.
     contents = [sticker_prompt]
 
     if reference_image_path and os.path.exists(reference_image_path):
-        ref_image = PILImage.open(reference_image_path)
-        # Convert to bytes for Gemini
-        img_buffer = io.BytesIO()
-        ref_image.save(img_buffer, format='JPEG')
-        img_bytes = img_buffer.getvalue()
-
-        # Add as inline data
-        contents.append(types.Part.from_bytes(data=img_bytes, mime_type="image/jpeg"))
+        # Inline data: original bytes if Gemini-ready, else a cached, upright 1024px JPEG
+        img_bytes, mime_type = load_reference_image(reference_image_path)
+        contents.append(types.Part.from_bytes(data=img_bytes, mime_type=mime_type))
         print(f"✓ Using reference image: {reference_image_path}")
 
     print(f"⏳ Generating sticker...")
 
-    response = client.models.generate_content(
+    response = _client().models.generate_content(
         model=MODEL,
         contents=contents,
     )
@@ -65,6 +69,7 @@ def generate_sticker(prompt: str, reference_image_path: str = None) -> PILImage.
 
             # Convert bytes to PIL Image
             pil_image = PILImage.open(io.BytesIO(image_data))
+            pil_image.load()  # decode now and release the response buffer
             print("✓ Sticker generated!")
             return pil_image
         elif hasattr(part, 'text') and part.text:
@@ -75,21 +80,39 @@ def generate_sticker(prompt: str, reference_image_path: str = None) -> PILImage.
 
 def remove_white_background(image: PILImage.Image, threshold: int = 240) -> PILImage.Image:
     """Remove white background and make it transparent."""
-    image = image.convert("RGBA")
-    pixels = image.load()
+    arr = np.array(image.convert("RGBA"))
+
+    mask = (arr[..., 0] > threshold) & (arr[..., 1] > threshold) & (arr[..., 2] > threshold)
+    arr[mask] = (255, 255, 255, 0)  # Transparent
+
+    return PILImage.fromarray(arr, "RGBA")
 
-    for y in range(image.height):
-        for x in range(image.width):
-            r, g, b, a = pixels[x, y]
-            if r > threshold and g > threshold and b > threshold:
-                pixels[x, y] = (255, 255, 255, 0)  # Transparent
 
-    return image
+def _transform_frames(image: PILImage.Image, animation: str, num_frames: int,
+                      source: PILImage.Image = None) -> list:
+    """Pulse/wiggle: PIL resize/rotate, rendered once per distinct size/angle and shared between frames."""
+
+    if animation == "pulse":
+        # Pulsing/breathing effect: one LANCZOS pass per size straight from the full-res
+        # source instead of the lossy source → 512 → new_size chain
+        sizes = (STICKER_SIZE * (0.9 + 0.1 * wave(num_frames))).astype(int)
+        layer = remove_white_background(source) if source is not None else image
+        return pulse_frames(layer, sizes, STICKER_SIZE)
+
+    if animation == "wiggle":
+        # Rotation wiggle
+        return rotated_frames(image, wave(num_frames) * 8, size=STICKER_SIZE)
+
+    # unknown → static
+    center = ((STICKER_SIZE - image.width) // 2, (STICKER_SIZE - image.height) // 2)
+    return [place(image, center, STICKER_SIZE)] * num_frames
 
 
 def create_animated_webp(image: PILImage.Image, animation: str = "float",
-                         output_path: str = "sticker.webp") -> str:
-    """Create animated WebP sticker for WhatsApp."""
+                         output_path="sticker.webp"):
+    """Create animated WebP sticker for WhatsApp (output_path: file path or binary file object)."""
+
+    source = image  # full-resolution original (pulse resamples from it directly)
 
     # Resize to 512x512
     image = image.resize((STICKER_SIZE, STICKER_SIZE), PILImage.LANCZOS)
@@ -98,77 +121,21 @@ def create_animated_webp(image: PILImage.Image, animation: str = "float",
     image = remove_white_background(image)
 
     # Animation settings
-    frames = []
     num_frames = 20
     duration = 67  # ~15fps
 
-    for i in range(num_frames):
-        t = i / num_frames
-        frame = PILImage.new("RGBA", (STICKER_SIZE, STICKER_SIZE), (0, 0, 0, 0))
-
-        if animation == "float":
-            # Gentle floating motion
-            offset_y = int(math.sin(t * 2 * math.pi) * 15)
-            pos = ((STICKER_SIZE - image.width) // 2,
-                   (STICKER_SIZE - image.height) // 2 + offset_y)
-        elif animation == "bounce":
-            # Bouncing motion
-            offset_y = int(abs(math.sin(t * 2 * math.pi)) * 25)
-            pos = ((STICKER_SIZE - image.width) // 2,
-                   (STICKER_SIZE - image.height) // 2 - offset_y)
-        elif animation == "pulse":
-            # Pulsing/breathing effect
-            scale = 0.9 + 0.1 * math.sin(t * 2 * math.pi)
-            new_size = int(STICKER_SIZE * scale)
-            scaled = image.resize((new_size, new_size), PILImage.LANCZOS)
-            pos = ((STICKER_SIZE - new_size) // 2, (STICKER_SIZE - new_size) // 2)
-            frame.paste(scaled, pos, scaled)
-            frames.append(frame)
-            continue
-        elif animation == "wiggle":
-            # Rotation wiggle
-            angle = math.sin(t * 2 * math.pi) * 8
-            rotated = image.rotate(angle, resample=PILImage.BICUBIC, expand=False)
-            pos = ((STICKER_SIZE - rotated.width) // 2,
-                   (STICKER_SIZE - rotated.height) // 2)
-            frame.paste(rotated, pos, rotated)
-            frames.append(frame)
-            continue
-        else:  # static
-            pos = ((STICKER_SIZE - image.width) // 2,
-                   (STICKER_SIZE - image.height) // 2)
-
-        frame.paste(image, pos, image)
-        frames.append(frame)
-
-    # Save as animated WebP
-    frames[0].save(
-        output_path,
-        save_all=True,
-        append_images=frames[1:],
-        duration=duration,
-        loop=0,
-        format="WEBP",
-        quality=85,
-        method=6
-    )
-
-    # Check file size & compress if needed
-    if os.path.getsize(output_path) > MAX_FILE_SIZE:
-        print("⚠ Compressing to meet WhatsApp size limit...")
-        frames[0].save(
-            output_path,
-            save_all=True,
-            append_images=frames[1:],
-            duration=duration,
-            loop=0,
-            format="WEBP",
-            quality=60,
-            method=6
-        )
-
-    size_kb = os.path.getsize(output_path) / 1024
-    print(f"✓ Saved: {output_path} ({size_kb:.1f} KB)")
+    if animation in ("float", "bounce", "static"):
+        # Frames differ only in y → one NumPy batch instead of 20 canvases + pastes
+        x0 = (STICKER_SIZE - image.width) // 2
+        y0 = (STICKER_SIZE - image.height) // 2
+        positions = [(x0, y0 + dy) for dy in vertical_offsets(animation, num_frames)]
+        frames = translate_frames(image, positions, STICKER_SIZE)
+    else:
+        frames = _transform_frames(image, animation, num_frames, source)
+
+    # Save as animated WebP (compresses further only if over the size limit)
+    size_kb = save_animated_webp(frames, output_path, duration, max_size=MAX_FILE_SIZE) / 1024
+    print(f"✓ Saved: {output_path if isinstance(output_path, str) else 'in memory'} ({size_kb:.1f} KB)")
     return output_path
 
 
@@ -49,9 +49,10 @@
 
 
 
-import requests
 import urllib.parse
 
+from controllers._http import CHUNK_SIZE, client as http
+
 ASPECT_RATIOS = {
     "1:1": (1024, 1024),
     "16:9": (1920, 1080),
@@ -90,10 +91,11 @@ def generate_image(
     encoded_prompt = urllib.parse.quote(prompt)
     url = f"https://image.pollinations.ai/prompt/{encoded_prompt}"
 
-    response = requests.get(url, params=params, timeout=300)
-    response.raise_for_status()
-
-    with open(output_file, "wb") as f:
-        f.write(response.content)
+    # Shared keep-alive client (no TCP/TLS handshake per image), body streamed straight to disk
+    with http.stream("GET", url, params=params, timeout=300) as response:
+        response.raise_for_status()
+        with open(output_file, "wb") as f:
+            for chunk in response.iter_bytes(CHUNK_SIZE):
+                f.write(chunk)
 
     return output_file
@@ -4,18 +4,27 @@ Uses GPT-4o-mini to generate frame prompts → Replicate for images → Animated
 """
 
 import os
-import time
-import requests
+import io
+import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 from openai import OpenAI
 import replicate
-from rembg import remove
 from dotenv import load_dotenv
 
+from controllers._http import session
+from controllers._rembg import batch_remove, has_transparent_border
+from controllers._webp import save_animated_webp
+
 load_dotenv()
 
 openai_client = OpenAI()
 
+STICKER_MODEL = "fofr/sticker-maker:4acb778eb059772225ec213948f0660867b2e03f277448f18cf1800b96a65a1a"
+REPLICATE_MAX_CONCURRENCY = 3  # in-flight prediction jobs
+RETRY_BACKOFF = 5  # seconds, doubled per 429 retry (+ jitter)
+
 
 def generate_frame_prompts(concept: str, num_frames: int = 5) -> list:
     """Use GPT-4o-mini to generate sequential frame prompts."""
@@ -60,117 +69,114 @@ def generate_frame_prompts(concept: str, num_frames: int = 5) -> list:
     return prompts
 
 
-def generate_frame_image(prompt: str, index: int, max_retries: int = 3) -> str:
-    """Generate single frame using Replicate with retry logic."""
-    from rembg import remove
-
-    print(f"🎨 Generating frame {index + 1}...")
+async def generate_frame_image(prompt: str, index: int, semaphore: asyncio.Semaphore,
+                               max_retries: int = 3) -> Image.Image:
+    """Generate single frame using Replicate; back off only on real 429 responses."""
 
     for attempt in range(max_retries):
         try:
-            # Wait to avoid rate limiting
-            if index > 0 or attempt > 0:
-                wait = 12 if attempt == 0 else 15 * (attempt + 1)
-                print(f"   ⏳ Waiting {wait}s to avoid rate limit...")
-                time.sleep(wait)
-
-            output = replicate.run(
-                "fofr/sticker-maker:4acb778eb059772225ec213948f0660867b2e03f277448f18cf1800b96a65a1a",
-                input={
-                    "prompt": prompt,
-                    "steps": 17,
-                    "width": 1024,
-                    "height": 1024,
-                    "output_format": "png",
-                    "number_of_images": 1,
-                    "negative_prompt": "ugly, blurry, low quality, text, watermark, different style"
-                }
-            )
+            async with semaphore:
+                print(f"🎨 Generating frame {index + 1}...")
+
+                output = await replicate.async_run(
+                    STICKER_MODEL,
+                    input={
+                        "prompt": prompt,
+                        "steps": 17,
+                        "width": 1024,
+                        "height": 1024,
+                        "output_format": "png",
+                        "number_of_images": 1,
+                        "negative_prompt": "ugly, blurry, low quality, text, watermark, different style"
+                    }
+                )
 
             url = output[0] if isinstance(output, list) else output
             if hasattr(url, 'url'):
                 url = url.url
 
-            filepath = f"frame_{index}.png"
-            response = requests.get(url)
-            with open(filepath, "wb") as f:
-                f.write(response.content)
+            # Decode + remove background in memory (overlaps with the other frames' inference)
+            frame = await asyncio.to_thread(_fetch_transparent_frame, url, index)
 
-            # Remove background to ensure transparency
-            print(f"   🔧 Removing background...")
-            img = Image.open(filepath)
-            img_no_bg = remove(img)
-            img_no_bg.save(filepath)
-
-            print(f"   ✅ Frame {index + 1} saved (transparent)")
-            return filepath
+            print(f"   ✅ Frame {index + 1} ready (transparent)")
+            return frame
 
         except Exception as e:
             if "429" in str(e) and attempt < max_retries - 1:
-                print(f"   ⚠️ Rate limited, retrying (attempt {attempt + 2}/{max_retries})...")
+                backoff = RETRY_BACKOFF * 2 ** attempt + random.random()
+                print(f"   ⚠️ Frame {index + 1} rate limited, retrying in {backoff:.1f}s "
+                      f"(attempt {attempt + 2}/{max_retries})...")
+                await asyncio.sleep(backoff)
                 continue
             raise
 
     raise Exception("Max retries exceeded")
 
 
-def create_animated_sticker(frame_paths: list, output: str = "animated_sticker_newww_03.webp", fps: int = 3):
-    """Combine frames into animated WebP for WhatsApp."""
+def _fetch_transparent_frame(url: str, index: int) -> Image.Image:
+    response = session.get(url, timeout=120)
+    response.raise_for_status()
+    img = Image.open(io.BytesIO(response.content))
+    img.load()
+
+    # sticker-maker usually returns a die-cut PNG already → skip U²-Net when the border is transparent
+    if has_transparent_border(img):
+        print(f"   ⏭️ Frame {index + 1} already transparent, skipping rembg")
+        return img
+
+    print(f"   🔧 Removing background from frame {index + 1}...")
+    return batch_remove([img])[0]
+
+
+async def generate_frame_images(prompts: list) -> list:
+    """All frames concurrently (in memory), at most REPLICATE_MAX_CONCURRENCY jobs in flight."""
+    semaphore = asyncio.Semaphore(REPLICATE_MAX_CONCURRENCY)
+    return await asyncio.gather(*[
+        generate_frame_image(prompt, i, semaphore) for i, prompt in enumerate(prompts)
+    ])
+
+
+def create_animated_sticker(frames: list, output: str = "animated_sticker_newww_03.webp", fps: int = 3):
+    """Combine in-memory frames into animated WebP for WhatsApp."""
 
     print("🎬 Creating animated WebP...")
 
-    frames = []
-    for path in frame_paths:
-        img = Image.open(path).convert('RGBA')
-        img = img.resize((512, 512), Image.Resampling.LANCZOS)
-        frames.append(img)
+    frames = [
+        img.convert('RGBA').resize((512, 512), Image.Resampling.LANCZOS)
+        for img in frames
+    ]
 
     # Add reverse frames for smooth loop
     frames_loop = frames + frames[-2:0:-1]
 
     duration = 1000 // fps
 
-    frames_loop[0].save(
+    # Lossy/lossless chosen per frame by libwebp; q85 → q60 only if over WhatsApp's 500KB
+    save_animated_webp(
+        frames_loop,
         output,
-        'WEBP',
-        save_all=True,
-        append_images=frames_loop[1:],
-        duration=duration,
-        loop=0,
-        quality=85
+        duration,
+        max_size=500 * 1024,
+        quality=85,
+        fallback_quality=60,
+        allow_mixed=True
     )
 
     size_kb = os.path.getsize(output) / 1024
     print(f"✅ Saved: {output} ({size_kb:.0f}KB)")
 
-    # Compress if too large for WhatsApp (max 500KB)
-    if size_kb > 500:
-        print("⚠️ File > 500KB, compressing...")
-        frames_loop[0].save(
-            output,
-            'WEBP',
-            save_all=True,
-            append_images=frames_loop[1:],
-            duration=duration,
-            loop=0,
-            quality=60
-        )
-        size_kb = os.path.getsize(output) / 1024
-        print(f"✅ Compressed to {size_kb:.0f}KB")
-
     return output
 
 
-def cleanup_frames(num_frames: int):
-    """Delete temporary frame files."""
-    for i in range(num_frames):
-        filepath = f"frame_{i}.png"
-        if os.path.exists(filepath):
-            os.remove(filepath)
-    print("🧹 Cleaned up temporary files")
+def save_frames(frames: list) -> None:
+    """Write the raw frames as frame_N.png in one thread-pool burst."""
+    with ThreadPoolExecutor() as executor:
+        list(executor.map(lambda item: item[1].save(f"frame_{item[0]}.png"), enumerate(frames)))
+    print(f"💾 Saved {len(frames)} frames")
 
 
-def generate_animated_sticker(concept: str, num_frames: int = 5, cleanup: bool = True):
+def generate_animated_sticker(concept: str, num_frames: int = 5, save_raw_frames: bool = False,
+                              output_file: str = "animated_sticker_newww_03.webp"):
     """Main function: concept → animated sticker."""
 
     print(f"\n{'='*50}")
@@ -180,20 +186,17 @@ def generate_animated_sticker(concept: str, num_frames: int = 5, cleanup: bool =
     # Step 1: Generate prompts with GPT
     prompts = generate_frame_prompts(concept, num_frames)
 
-    # Step 2: Generate each frame with Replicate
-    print(f"\n⏱️ This will take ~{num_frames * 15}s due to rate limits\n")
-    frame_paths = []
-    for i, prompt in enumerate(prompts):
-        path = generate_frame_image(prompt, i)
-        frame_paths.append(path)
+    # Step 2: Generate all frames concurrently with Replicate
+    print()
+    frames = asyncio.run(generate_frame_images(prompts))
 
     # Step 3: Combine into animated WebP
     print()
-    output = create_animated_sticker(frame_paths)
+    output = create_animated_sticker(frames, output_file)
 
-    # Step 4: Cleanup temp files
-    if cleanup:
-        cleanup_frames(num_frames)
+    # Step 4: Optional frame artifacts (written after the WebP is assembled)
+    if save_raw_frames:
+        save_frames(frames)
 
     print(f"\n{'='*50}")
     print(f"🎉 Done! Your animated sticker: {output}")
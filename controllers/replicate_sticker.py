@@ -9,17 +9,19 @@ Usage:
 """
 
 import os
-import math
-import requests
 from PIL import Image
 from dotenv import load_dotenv
 import replicate
 
+from controllers._http import download
+from controllers._animation import pulse_frames, rotated_frames, translate_frames, wave
+from controllers._webp import save_animated_webp
+
 load_dotenv()
 
 
-def generate_sticker(prompt: str) -> str:
-    """Generate static sticker image from prompt."""
+def generate_sticker(prompt: str, output_path: str = "temp_sticker.png") -> str:
+    """Generate static sticker image from prompt, downloaded to output_path."""
     print(f"🎨 Generating: {prompt}")
 
     output = replicate.run(
@@ -40,15 +42,28 @@ def generate_sticker(prompt: str) -> str:
     if hasattr(url, 'url'):
         url = url.url
 
-    response = requests.get(url)
-    with open("temp_sticker.png", "wb") as f:
-        f.write(response.content)
+    download(url, output_path)
 
     print("✅ Sticker generated")
-    return "temp_sticker.png"
+    return output_path
+
+
+def _transform_frames(img: Image.Image, animation: str, frames: int) -> list:
+    """Pulse/wiggle/static frames, rendered once per distinct size/angle."""
 
+    if animation == "pulse":
+        # Grow and shrink
+        sizes = (512 * (0.85 + 0.15 * wave(frames, absolute=True))).astype(int)
+        return pulse_frames(img, sizes, 512)
 
-def create_animated_webp(image_path: str, output_path: str = "sticker.webp",
+    if animation == "wiggle":
+        # Rotate back and forth (expand=False keeps 512x512, so no resize is needed)
+        return rotated_frames(img, 8 * wave(frames, harmonic=2), resample=Image.Resampling.BICUBIC)
+
+    return [img] * frames
+
+
+def create_animated_webp(image_path: str, output_path="sticker.webp",
                          animation: str = "bounce", frames: int = 20, fps: int = 15):
     """
     Create animated WebP for WhatsApp.
@@ -58,91 +73,46 @@ def create_animated_webp(image_path: str, output_path: str = "sticker.webp",
     - Animated WebP format
     - Max 500KB
     - Transparent background
+
+    output_path: file path or writable binary file object
     """
     print(f"🎬 Creating {animation} animation...")
 
     img = Image.open(image_path).convert('RGBA')
     img = img.resize((512, 512), Image.Resampling.LANCZOS)
 
-    animated_frames = []
     duration = 1000 // fps  # ms per frame
 
-    for i in range(frames):
-        progress = i / frames
-        angle = progress * 2 * math.pi
-
+    if animation in ("bounce", "shake"):
+        # Pure translations of one 480px copy → one NumPy batch instead of per-frame canvases + pastes
+        small = img.resize((480, 480), Image.Resampling.LANCZOS)
         if animation == "bounce":
-            # Bounce up and down
-            offset = int(25 * abs(math.sin(angle)))
-            frame = Image.new('RGBA', (512, 512), (0, 0, 0, 0))
-            small = img.resize((480, 480), Image.Resampling.LANCZOS)
-            frame.paste(small, (16, 32 - offset), small)
-
-        elif animation == "shake":
-            # Shake left-right
-            offset = int(15 * math.sin(angle * 2))
-            frame = Image.new('RGBA', (512, 512), (0, 0, 0, 0))
-            small = img.resize((480, 480), Image.Resampling.LANCZOS)
-            frame.paste(small, (16 + offset, 16), small)
-
-        elif animation == "pulse":
-            # Grow and shrink
-            scale = 0.85 + 0.15 * abs(math.sin(angle))
-            new_size = int(512 * scale)
-            scaled = img.resize((new_size, new_size), Image.Resampling.LANCZOS)
-            frame = Image.new('RGBA', (512, 512), (0, 0, 0, 0))
-            offset = (512 - new_size) // 2
-            frame.paste(scaled, (offset, offset), scaled)
-
-        elif animation == "wiggle":
-            # Rotate back and forth
-            rotation = 8 * math.sin(angle * 2)
-            rotated = img.rotate(rotation, resample=Image.Resampling.BICUBIC, expand=False)
-            frame = rotated.resize((512, 512), Image.Resampling.LANCZOS)
-
+            offsets = (25 * wave(frames, absolute=True)).astype(int)
+            positions = [(16, 32 - offset) for offset in offsets]
         else:
-            frame = img.copy()
-
-        animated_frames.append(frame)
-
-    # Save as animated WebP
-    animated_frames[0].save(
+            offsets = (15 * wave(frames, harmonic=2)).astype(int)
+            positions = [(16 + offset, 16) for offset in offsets]
+        animated_frames = translate_frames(small, positions, 512)
+    else:
+        animated_frames = _transform_frames(img, animation, frames)
+
+    # Save as animated WebP (q90, or a sample-predicted quality; q70 retry only if still over 500KB)
+    size = save_animated_webp(
+        animated_frames,
         output_path,
-        'WEBP',
-        save_all=True,
-        append_images=animated_frames[1:],
-        duration=duration,
-        loop=0,
+        duration,
+        max_size=500 * 1024,
         quality=90,
-        method=6
+        fallback_quality=70,
+        predict=True
     )
 
-    size_kb = os.path.getsize(output_path) / 1024
-    print(f"✅ Animated sticker saved: {output_path} ({size_kb:.0f}KB)")
-
-    if size_kb > 500:
-        print("⚠️ File > 500KB, compressing...")
-        compress_webp(output_path, animated_frames, duration)
+    size_kb = size / 1024
+    print(f"✅ Animated sticker saved: {output_path if isinstance(output_path, str) else 'in memory'} ({size_kb:.0f}KB)")
 
     return output_path
 
 
-def compress_webp(path: str, frames: list, duration: int):
-    """Compress if file too large."""
-    # Reduce quality
-    frames[0].save(
-        path, 'WEBP',
-        save_all=True,
-        append_images=frames[1:],
-        duration=duration,
-        loop=0,
-        quality=70,
-        method=6
-    )
-    size_kb = os.path.getsize(path) / 1024
-    print(f"✅ Compressed to {size_kb:.0f}KB")
-
-
 def main():
     print("\n🐱 WhatsApp Animated Sticker Generator\n")
 
@@ -190,234 +190,409 @@ FAST version - no trial/error compression loops
 """
 
 import os
+import math
+import itertools
+import time
 import uuid
 import asyncio
-import requests
-from typing import Tuple
+from types import MappingProxyType
+from typing import NamedTuple, Tuple
+from concurrent.futures import ThreadPoolExecutor
 
+import av
 from runware import Runware, IVideoInference
-from moviepy import VideoFileClip
 from PIL import Image
-from rembg import remove
 from dotenv import load_dotenv
 
+from controllers._http import download
+from controllers._rembg import MAX_BATCH, batch_remove
+from controllers._webp import FALLBACK_METHOD, estimate_size, save_animated_webp
+from controllers._task_store import new_task_id
+
 load_dotenv()
 
 
 
-VIDEO_ASPECT_RATIOS = {
+class Size(NamedTuple):
+    w: int
+    h: int
+
+
+class GeneratedVideo(NamedTuple):
+    task_id: str
+    original_path: str
+    transparent_path: str
+
+
+# Read-only: shared by every request, never mutated
+VIDEO_ASPECT_RATIOS = MappingProxyType({
     # ---------- 480p-ish ----------
-    "16:9_480p": (864, 480),
-    "4:3_480p": (736, 544),
-    "1:1_480p": (640, 640),
-    "3:4_480p": (544, 736),
-    "9:16_480p": (480, 864),
-    "21:9_480p": (960, 416),
+    "16:9_480p": Size(864, 480),
+    "4:3_480p": Size(736, 544),
+    "1:1_480p": Size(640, 640),
+    "3:4_480p": Size(544, 736),
+    "9:16_480p": Size(480, 864),
+    "21:9_480p": Size(960, 416),
 
     # ---------- 720p-ish ----------
-    "16:9_720p": (1248, 704),
-    "4:3_720p": (1120, 832),
-    "1:1_720p": (960, 960),
-    "3:4_720p": (832, 1120),
-    "9:16_720p": (704, 1248),
-    "21:9_720p": (1504, 640),
+    "16:9_720p": Size(1248, 704),
+    "4:3_720p": Size(1120, 832),
+    "1:1_720p": Size(960, 960),
+    "3:4_720p": Size(832, 1120),
+    "9:16_720p": Size(704, 1248),
+    "21:9_720p": Size(1504, 640),
 
-}
+})
 
 
 
 MAX_FILE_SIZE = 500 * 1024  # 500KB
 
+# Runware polling: start fast, back off to POLL_MAX_DELAY, give up after POLL_DEADLINE seconds
+POLL_INITIAL_DELAY = 0.5
+POLL_MAX_DELAY = 5.0
+POLL_BACKOFF = 1.5
+POLL_DEADLINE = 600
+
+VIDEO_WEBP_QUALITY = 50
+MIN_SIDE = 256
+ALPHA_THRESHOLD = 8  # rembg leaves faint matte noise; ignore it when cropping
+RESIZE_REDUCING_GAP = 2.0
+# (max estimate/budget ratio, libwebp method): cheap methods only with headroom to spare
+FAST_METHODS = ((0.6, 0), (0.85, 4))
+
+# Connected Runware clients (as connect tasks), keyed by event loop: each FastAPI worker's loop
+# and the desktop app's one long-lived loop thread keep theirs until close_runware() at shutdown
+_runware_clients = {}
+
+MAX_DECODE_INTERVALS = 4  # parallel keyframe-aligned decodes in iter_frame_batches
+
+
+def _resize_all(frames: list, size: tuple) -> list:
+    """
+    Downscale frames in a thread pool (PIL releases the GIL while resampling).
+    reducing_gap: integer box-reduce first, LANCZOS only over the last ≤2× step.
+    """
+    with ThreadPoolExecutor(max_workers=min(len(frames), os.cpu_count() or 1)) as executor:
+        return list(executor.map(
+            lambda f: f.resize(size, Image.LANCZOS, reducing_gap=RESIZE_REDUCING_GAP), frames
+        ))
+
+
+def _crop_to_content(frames: list) -> list:
+    """Crop every frame to the union of their alpha bounding boxes (drops the empty border)."""
+
+    boxes = [f.getchannel("A").point(lambda a: 255 if a > ALPHA_THRESHOLD else 0).getbbox() for f in frames]
+    boxes = [box for box in boxes if box]
+    if not boxes:
+        return frames
+
+    box = (
+        min(b[0] for b in boxes), min(b[1] for b in boxes),
+        max(b[2] for b in boxes), max(b[3] for b in boxes),
+    )
+    if box == (0, 0, *frames[0].size):
+        return frames
+    return [f.crop(box) for f in frames]
+
+
+def _encode_method(ratio: float) -> int:
+    """Fastest libwebp method whose output still fits (estimate is at method 6; method 0 runs ~25% larger)."""
+    for max_ratio, method in FAST_METHODS:
+        if ratio <= max_ratio:
+            return method
+    return FALLBACK_METHOD
+
 
 def prepare_frames_for_whatsapp(
         frames: list,
         fps: int,
         target_size: int = MAX_FILE_SIZE
-) -> Tuple[list, int]:
+) -> Tuple[list, int, int]:
     """
     Prepare frames to fit WhatsApp limits.
-    Calculates optimal settings upfront - NO trial/error loops.
+    Crops to content, then sizes from a real sample encode - NO trial/error loops.
 
-    Returns: (processed_frames, adjusted_fps)
+    Returns: (processed_frames, adjusted_fps, webp_method)
     """
+    frames = _crop_to_content(frames)
     num_frames = len(frames)
     frame_w, frame_h = frames[0].size
 
-    # Estimate: ~3-5KB per 512x512 frame at quality 50
-    # More frames or bigger size = need more aggressive settings
-    estimated_size = num_frames * (frame_w / 512) * (frame_h / 512) * 4000
+    # Sample encode at the final settings, extrapolated to all frames
+    estimated_size = estimate_size(frames, int(1000 / fps), VIDEO_WEBP_QUALITY, FALLBACK_METHOD)
 
-    print(f"  Input: {num_frames} frames @ {frame_w}x{frame_h}")
-    print(f"  Estimated raw size: ~{estimated_size / 1024:.0f}KB")
+    print(f"  Input: {num_frames} frames @ {frame_w}x{frame_h} (cropped to content)")
+    print(f"  Estimated size: ~{estimated_size / 1024:.0f}KB")
 
-    # Determine compression level needed
     ratio = estimated_size / target_size
 
     if ratio <= 1:
-        # Already good
-        print(f"  → No compression needed")
-        return frames, fps
-
-    elif ratio <= 2:
-        # Light compression - just resize to 384x384
-        new_size = (384, 384)
-        print(f"  → Light compression: resize to {new_size}")
-        return [f.resize(new_size, Image.LANCZOS) for f in frames], fps
-
-    elif ratio <= 4:
-        # Medium - resize to 320x320
-        new_size = (320, 320)
-        print(f"  → Medium compression: resize to {new_size}")
-        return [f.resize(new_size, Image.LANCZOS) for f in frames], fps
-
-    elif ratio <= 8:
-        # Heavy - resize + skip frames
-        new_size = (256, 256)
-        skip = 2
-        reduced = frames[::skip]
-        new_fps = max(fps // skip, 5)
-        print(f"  → Heavy compression: {new_size}, skip every {skip}nd frame ({len(reduced)} frames)")
-        return [f.resize(new_size, Image.LANCZOS) for f in reduced], new_fps
-
+        method = _encode_method(ratio)
+        print(f"  → No compression needed (WebP method {method})")
+        return frames, fps, method
+
+    # Bytes scale ~ with pixel area → shrink each side by √ratio, down to MIN_SIDE
+    scale = min(1.0, max((1 / ratio) ** 0.5, MIN_SIDE / max(frame_w, frame_h)))
+    new_size = (max(1, round(frame_w * scale)), max(1, round(frame_h * scale)))
+
+    # Whatever resizing can't absorb comes out of the frame count
+    skip = max(1, math.ceil(ratio * scale ** 2 - 0.05))
+    if skip > 1:
+        frames = frames[::skip]
+        fps = max(fps // skip, 4)
+        print(f"  → Resize to {new_size}, keep every {skip} frames ({len(frames)} frames @ {fps}fps)")
     else:
-        # Extreme - small size + aggressive frame skip
-        new_size = (256, 256)
-        skip = max(3, int(ratio / 4))
-        reduced = frames[::skip]
-        new_fps = max(fps // skip, 4)
-        print(f"  → Extreme compression: {new_size}, keep every {skip}th frame ({len(reduced)} frames)")
-        return [f.resize(new_size, Image.LANCZOS) for f in reduced], new_fps
+        print(f"  → Resize to {new_size}")
 
+    # Sized to land right at the budget → spend the slowest, smallest method on it
+    return _resize_all(frames, new_size), fps, FALLBACK_METHOD
 
-async def generate_runware_transparent_sticker(
-        prompt: str,
-        duration: int = 3,
-        fps: int = 10,
-) -> Tuple[str, str]:
+
+def _keyframe_pts(video_path: str) -> list:
+    """Keyframe PTS from a demux-only pass (no decoding)."""
+    with av.open(video_path) as container:
+        return sorted(
+            packet.pts for packet in container.demux(video=0)
+            if packet.is_keyframe and packet.pts is not None
+        )
+
+
+def _decode_interval(video_path: str, fps: int, start_pts, end_pts):
+    """Decode [start_pts, end_pts) from the preceding keyframe, yield frames on the fps grid."""
+
+    with av.open(video_path) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        frame_step = 1.0 / float(stream.average_rate or 24)
+
+        if start_pts is not None:
+            container.seek(start_pts, stream=stream)
+
+        for frame in container.decode(stream):
+            if frame.time is None or frame.pts is None:
+                continue
+            if start_pts is not None and frame.pts < start_pts:
+                continue
+            if end_pts is not None and frame.pts >= end_pts:
+                break
+
+            # Keep the first frame at or after each 1/fps target (same grid in every interval)
+            if math.floor(frame.time * fps + 1e-6) > math.floor((frame.time - frame_step) * fps + 1e-6):
+                yield frame.to_image()
+
+
+def iter_frame_batches(video_path: str, fps: int, batch_size: int = MAX_BATCH):
     """
-    Generate video and return both versions.
+    Decode a video with PyAV and yield target-fps frames in order, batch_size at a time.
+    Keyframe-aligned intervals are decoded in parallel threads (PyAV releases the GIL),
+    one container per interval; single-GOP clips stream out of one threaded decode pass.
     """
 
-    output_dir = os.path.join(os.getcwd(), "outputs")
-    os.makedirs(output_dir, exist_ok=True)
+    keyframes = _keyframe_pts(video_path)
+    intervals = min(len(keyframes), os.cpu_count() or 1, MAX_DECODE_INTERVALS)
 
-    temp_id = uuid.uuid4().hex
-    original_video_path = os.path.join(output_dir, f"{temp_id}_original.mp4")
-    transparent_webp_path = os.path.join(output_dir, f"{temp_id}_transparent.webp")
+    if intervals <= 1:
+        frames = _decode_interval(video_path, fps, None, None)
+        while batch := list(itertools.islice(frames, batch_size)):
+            yield batch
+        return
 
-    runware = Runware(
-        api_key=os.environ.get("RUNWARE_API_KEY"),
-        timeout=600
-    )
-    await runware.connect()
+    # Roughly equal runs of GOPs, each bounded by keyframes
+    bounds = [keyframes[len(keyframes) * i // intervals] for i in range(intervals)] + [None]
+    bounds[0] = None  # first interval starts at the beginning of the file
+
+    with ThreadPoolExecutor(max_workers=intervals) as executor:
+        parts = executor.map(
+            lambda i: list(_decode_interval(video_path, fps, bounds[i], bounds[i + 1])),
+            range(intervals)
+        )
+        for part in parts:  # in order, each as soon as it (and those before it) finish
+            for i in range(0, len(part), batch_size):
+                yield part[i:i + batch_size]
+
+
+def extract_frames(video_path: str, fps: int) -> list:
+    """Decode a video and keep frames at the target fps."""
+    return [frame for batch in iter_frame_batches(video_path, fps) for frame in batch]
+
+
+def extract_transparent_frames(video_path: str, fps: int) -> list:
+    """
+    Decode and cut out frames as a two-stage pipeline: each decoded batch goes to rembg
+    while later batches are still decoding.
+    """
+
+    with ThreadPoolExecutor(max_workers=1) as rembg_pool:
+        pending = [rembg_pool.submit(batch_remove, batch) for batch in iter_frame_batches(video_path, fps)]
+        return [frame for future in pending for frame in future.result()]
+
+
+async def get_runware() -> Runware:
+    """
+    One connected Runware client per event loop, reused across requests.
+    The SDK reconnects on its own if the websocket drops.
+    """
+
+    loop = asyncio.get_running_loop()
+    connecting = _runware_clients.get(loop)
+
+    if connecting is None:
+        async def _connect():
+            runware = Runware(
+                api_key=os.environ.get("RUNWARE_API_KEY"),
+                timeout=600
+            )
+            await runware.connect()
+            return runware
+
+        # Concurrent first requests share one connect instead of racing
+        connecting = _runware_clients[loop] = asyncio.ensure_future(_connect())
 
     try:
-        # 1️⃣ Generate video
-        task_uuid = str(uuid.uuid4())
+        return await asyncio.shield(connecting)
+    except Exception:
+        _runware_clients.pop(loop, None)
+        raise
+
+
+async def close_runware() -> None:
+    """Disconnect the current event loop's Runware client (app shutdown)."""
+    connecting = _runware_clients.pop(asyncio.get_running_loop(), None)
+    if connecting is None:
+        return
+    if not connecting.done():
+        connecting.cancel()  # still connecting → nothing to disconnect yet
+    elif not connecting.cancelled() and not connecting.exception():
+        await connecting.result().disconnect()
+
+
+async def _poll_video_url(runware: Runware, task_uuid: str, deadline: float = POLL_DEADLINE):
+    """Poll a video task with exponential backoff until it succeeds; None on deadline."""
+
+    delay = POLL_INITIAL_DELAY
+    start = time.monotonic()
 
-        request = IVideoInference(
+    while time.monotonic() - start < deadline:
+        print(f"Polling... ({time.monotonic() - start:.0f}s elapsed)")
+
+        videos = await runware.getResponse(
             taskUUID=task_uuid,
-            positivePrompt=prompt,
-            model="bytedance:2@2",
-            duration=duration,
-            width=640,
-            height=640,
-            fps=24,
-            deliveryMethod="async",
+            numberResults=1
         )
 
-        response = await runware.videoInference(requestVideo=request)
-        print(f"Task submitted: {response.taskUUID}")
+        if videos and len(videos) > 0:
+            video = videos[0]
+            if hasattr(video, 'status'):
+                if video.status == "success":
+                    print(f"Video ready: {video.videoURL}")
+                    return video.videoURL
+                elif video.status == "error":
+                    raise Exception(f"Generation failed: {video}")
+            elif hasattr(video, 'videoURL'):
+                return video.videoURL
 
-        # 2️⃣ Poll for results
-        video_url = None
-        max_attempts = 120
+        await asyncio.sleep(delay)
+        delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
 
-        for attempt in range(max_attempts):
-            print(f"Polling... ({attempt + 1}/{max_attempts})")
+    return None
 
-            videos = await runware.getResponse(
-                taskUUID=response.taskUUID,
-                numberResults=1
-            )
 
-            if videos and len(videos) > 0:
-                video = videos[0]
-                if hasattr(video, 'status'):
-                    if video.status == "success":
-                        video_url = video.videoURL
-                        print(f"Video ready: {video_url}")
-                        break
-                    elif video.status == "error":
-                        raise Exception(f"Generation failed: {video}")
-                elif hasattr(video, 'videoURL'):
-                    video_url = video.videoURL
-                    break
-
-            await asyncio.sleep(5)
-
-        if not video_url:
-            raise Exception("Timeout waiting for video")
-
-        # 3️⃣ Download
-        print("Downloading...")
-        dl_response = requests.get(video_url, timeout=600)
-        dl_response.raise_for_status()
-
-        with open(original_video_path, "wb") as f:
-            f.write(dl_response.content)
-
-        # 4️⃣ Extract frames
-        print("Extracting frames...")
-        clip = VideoFileClip(original_video_path)
-        frame_images = []
-
-        for frame in clip.iter_frames(fps=fps):
-            img = Image.fromarray(frame)
-            frame_images.append(img)
-
-        clip.close()
-        print(f"Got {len(frame_images)} frames")
-
-        # 5️⃣ Remove backgrounds (this is the slow part - can't speed up much)
-        print("Removing backgrounds...")
-        transparent_frames = []
-        for i, img in enumerate(frame_images):
-            rgba = remove(img).convert("RGBA")
-            transparent_frames.append(rgba)
-            if (i + 1) % 10 == 0:
-                print(f"  {i + 1}/{len(frame_images)}")
-
-        # 6️⃣ Prepare for WhatsApp (fast - just calculates once)
-        print("Preparing for WhatsApp...")
-        final_frames, final_fps = prepare_frames_for_whatsapp(
-            transparent_frames, fps, MAX_FILE_SIZE
-        )
+async def generate_runware_original_video(prompt: str, duration: int = 3) -> Tuple[str, str]:
+    """
+    Generate and download the sticker's source MP4 → (task_id, original_path).
+    """
 
-        # 7️⃣ Save WebP (single save, no loops)
-        print("Saving WebP...")
-        final_frames[0].save(
-            transparent_webp_path,
-            save_all=True,
-            append_images=final_frames[1:],
-            duration=int(1000 / final_fps),
-            loop=0,
-            format="WEBP",
-            quality=50,
-            method=4  # Balanced speed/compression
-        )
+    output_dir = os.path.join(os.getcwd(), "outputs")
+    os.makedirs(output_dir, exist_ok=True)
+
+    task_id = new_task_id()
+    original_video_path = os.path.join(output_dir, f"{task_id}_original.mp4")
+
+    runware = await get_runware()
+
+    # 1️⃣ Generate video
+    task_uuid = str(uuid.uuid4())
+
+    request = IVideoInference(
+        taskUUID=task_uuid,
+        positivePrompt=prompt,
+        model="bytedance:2@2",
+        duration=duration,
+        width=640,
+        height=640,
+        fps=24,
+        deliveryMethod="async",
+    )
+
+    response = await runware.videoInference(requestVideo=request)
+    print(f"Task submitted: {response.taskUUID}")
 
-        final_size = os.path.getsize(transparent_webp_path)
-        print(f"✅ Original: {original_video_path}")
-        print(f"✅ Sticker: {transparent_webp_path} ({final_size / 1024:.1f}KB)")
+    # 2️⃣ Poll for results
+    video_url = await _poll_video_url(runware, response.taskUUID)
 
-        if final_size > MAX_FILE_SIZE:
-            print(f"⚠️ Still {final_size / 1024:.1f}KB - may need manual adjustment")
+    if not video_url:
+        raise Exception("Timeout waiting for video")
 
-        return original_video_path, transparent_webp_path
+    # 3️⃣ Download
+    print("Downloading...")
+    await asyncio.to_thread(download, video_url, original_video_path, 600)
+
+    print(f"✅ Original: {original_video_path}")
+    return task_id, original_video_path
+
+
+async def make_transparent_sticker(task_id: str, original_video_path: str, fps: int = 10) -> str:
+    """
+    Turn a downloaded MP4 into the transparent WhatsApp WebP → transparent_path.
+    The original is only read, never deleted.
+    """
+
+    transparent_webp_path = os.path.join(os.path.dirname(original_video_path), f"{task_id}_transparent.webp")
+
+    # 4️⃣ + 5️⃣ Extract frames and remove backgrounds (pipelined, off the event loop)
+    print("Extracting frames and removing backgrounds...")
+    transparent_frames = await asyncio.to_thread(extract_transparent_frames, original_video_path, fps)
+    print(f"Got {len(transparent_frames)} frames")
+
+    # 6️⃣ Prepare for WhatsApp (crop, sample encode, resize → off the event loop too)
+    print("Preparing for WhatsApp...")
+    final_frames, final_fps, webp_method = await asyncio.to_thread(
+        prepare_frames_for_whatsapp, transparent_frames, fps, MAX_FILE_SIZE
+    )
+
+    # 7️⃣ Save WebP (single libwebp pass at the planned method, threaded, no retry loop)
+    print("Saving WebP...")
+    final_size = await asyncio.to_thread(
+        save_animated_webp,
+        final_frames,
+        transparent_webp_path,
+        int(1000 / final_fps),
+        quality=VIDEO_WEBP_QUALITY,
+        method=webp_method
+    )
+
+    print(f"✅ Sticker: {transparent_webp_path} ({final_size / 1024:.1f}KB)")
+
+    if final_size > MAX_FILE_SIZE:
+        print(f"⚠️ Still {final_size / 1024:.1f}KB - may need manual adjustment")
+
+    return transparent_webp_path
+
+
+async def generate_runware_transparent_sticker(
+        prompt: str,
+        duration: int = 3,
+        fps: int = 10,
+) -> GeneratedVideo:
+    """
+    Generate video and return both versions (with the task_id that names them).
+    """
+
+    task_id, original_video_path = await generate_runware_original_video(prompt, duration)
+    transparent_webp_path = await make_transparent_sticker(task_id, original_video_path, fps)
+    return GeneratedVideo(task_id, original_video_path, transparent_webp_path)
 
-    finally:
-        await runware.disconnect()
 
 async def generate_runware_video_only(
     prompt: str,
@@ -430,7 +605,7 @@ async def generate_runware_video_only(
     if aspect_ratio not in VIDEO_ASPECT_RATIOS:
         raise ValueError(f"Invalid aspect_ratio: {aspect_ratio}")
 
-    width, height = VIDEO_ASPECT_RATIOS[aspect_ratio]
+    size = VIDEO_ASPECT_RATIOS[aspect_ratio]
 
     output_dir = os.path.join(os.getcwd(), "outputs")
     os.makedirs(output_dir, exist_ok=True)
@@ -439,59 +614,36 @@ async def generate_runware_video_only(
     output_path = os.path.join(output_dir, f"{temp_id}_video.mp4")
     print(f"📁 Output path: {output_path}")
 
-    runware = Runware(
-        api_key=os.environ.get("RUNWARE_API_KEY"),
-        timeout=600
+    runware = await get_runware()
+
+    task_uuid = str(uuid.uuid4())
+
+    request = IVideoInference(
+        taskUUID=task_uuid,
+        positivePrompt=prompt,
+        model="bytedance:1@1",
+        duration=duration,
+        width=size.w,
+        height=size.h,
+        fps=fps,
+        outputFormat="mp4",
+        outputQuality=85,
+        deliveryMethod="async",
     )
-    await runware.connect()
-
-    try:
-        task_uuid = str(uuid.uuid4())
-
-        request = IVideoInference(
-            taskUUID=task_uuid,
-            positivePrompt=prompt,
-            model="bytedance:1@1",
-            duration=duration,
-            width=width,
-            height=height,
-            fps=fps,
-            outputFormat="mp4",
-            outputQuality=85,
-            deliveryMethod="async",
-        )
-        print(f"🚀 Submitting video inference task: {task_uuid}")
-
-        response = await runware.videoInference(requestVideo=request)
-
-        video_url = None
-        for _ in range(120):
-            print("⏳ Checking task status...")
-
-            results = await runware.getResponse(
-                taskUUID=response.taskUUID,
-                numberResults=1
-            )
-
-            if results and results[0].status == "success":
-                video_url = results[0].videoURL
-                break
+    print(f"🚀 Submitting video inference task: {task_uuid}")
 
-            await asyncio.sleep(5)
+    response = await runware.videoInference(requestVideo=request)
 
-        if not video_url:
-            raise Exception("Video generation timeout")
+    print("⏳ Checking task status...")
+    video_url = await _poll_video_url(runware, response.taskUUID)
 
-        dl = requests.get(video_url, timeout=600)
-        dl.raise_for_status()
+    if not video_url:
+        raise Exception("Video generation timeout")
 
-        with open(output_path, "wb") as f:
-            f.write(dl.content)
+    await asyncio.to_thread(download, video_url, output_path, 600)
 
-        return output_path
+    return output_path
 
-    finally:
-        await runware.disconnect()
 
 # if __name__ == "__main__":
 #     prompt = "A cat standing still suddenly becomes frozen, covered in ice, frost spreading over their body"
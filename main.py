@@ -1,3 +1,6 @@
+import os
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -9,7 +12,9 @@ from routes.gemini_sticker import router as gemini_router
 from routes.free_animation import router as free_animation_router
 from routes.replicate_animation import router as replicate_animation_router
 from routes.gemini_animation import router as gemini_animation_router
-from routes.video_model_animation import router as video_model_animation_router
+from routes.video_model_animation import router as video_model_animation_router, start_reaper, stop_reaper
+from controllers.video_model_animation import close_runware, get_runware
+from controllers._rembg import warm_up as warm_up_rembg
 
 app = FastAPI()
 
@@ -21,7 +26,6 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["x-task-id"],
 )
 
 app.include_router(image_generation_router)
@@ -35,5 +39,55 @@ app.include_router(gemini_animation_router)
 app.include_router(video_model_animation_router)
 
 
+@app.on_event("startup")
+async def warm_up():
+    # One file reaper per worker (included routers' own startup hooks would run it twice)
+    start_reaper()
+
+    # Model is loaded at import; one dummy inference moves first-run setup out of the first request
+    await asyncio.to_thread(warm_up_rembg)
+
+    if os.environ.get("RUNWARE_API_KEY"):
+        try:
+            await get_runware()
+        except Exception as e:
+            print(f"⚠️ Runware warm-up failed, will connect on first request: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_runware():
+    await stop_reaper()
+    # Runware websocket is opened on first use and kept for the app's lifetime
+    await close_runware()
+
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # Each worker loads its own rembg session and Runware connection → opt in via WEB_CONCURRENCY
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+
+    if os.environ.get("ENV") == "dev":
+        # File watcher + auto-reload (single process) for local development only
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    elif os.environ.get("ASGI_SERVER") == "granian":
+        # Granian implements the ASGI http.response.pathsend extension → FileResponse bodies
+        # are sent by the server from the path (no read()/send() copies through Python)
+        from granian import Granian
+        from granian.constants import Interfaces
+
+        Granian(
+            "main:app",
+            address="0.0.0.0",
+            port=8000,
+            interface=Interfaces.ASGI,
+            workers=workers,
+        ).serve()
+    else:
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=workers,
+            loop="auto",  # uvloop where installed (not on Windows)
+            http="httptools",
+            log_level="warning",
+        )
\ No newline at end of file
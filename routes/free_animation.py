@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Query, HTTPException
 from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 import os
-import uuid
+import shutil
+import asyncio
+import tempfile
 
 from controllers.free_animation import generate_animated_sticker
 
@@ -12,7 +15,7 @@ FPS = 4
 
 
 @router.get("/generate-free-animation")
-def generate_free_animation(
+async def generate_free_animation(
     concept: str = Query(..., description="Animation concept"),
     frames: int = Query(
         4,                 # default
@@ -31,10 +34,13 @@ def generate_free_animation(
             detail="OPENAI_API_KEY is not set"
         )
 
-    output_file = f"free_animation_{uuid.uuid4().hex}.webp"
+    # All artifacts in one per-request dir, removed once the response is sent
+    work_dir = tempfile.mkdtemp(prefix="gif_")
+    output_file = os.path.join(work_dir, "free_animation.webp")
 
     try:
-        generate_animated_sticker(
+        await asyncio.to_thread(
+            generate_animated_sticker,
             concept=concept,
             num_frames=frames,
             fps=FPS,
@@ -45,8 +51,10 @@ def generate_free_animation(
         return FileResponse(
             path=output_file,
             media_type="image/webp",
-            filename="whatsapp_sticker.webp"
+            filename="whatsapp_sticker.webp",
+            background=BackgroundTask(shutil.rmtree, work_dir, ignore_errors=True)
         )
 
     except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Query, HTTPException
-from fastapi.responses import FileResponse
-import os
-import uuid
+from fastapi.responses import Response
+import io
+import asyncio
 
 from controllers.free_sticker import (
     generate_sticker_free,
@@ -10,9 +10,11 @@ from controllers.free_sticker import (
 
 router = APIRouter()
 
+STICKER_HEADERS = {"Content-Disposition": 'attachment; filename="whatsapp_sticker.webp"'}
+
 
 @router.get("/generate-free-sticker")
-def generate_sticker(
+async def generate_sticker(
     prompt: str = Query(..., description="Prompt for sticker generation"),
     animation: str = Query(
         "float",
@@ -25,25 +27,18 @@ def generate_sticker(
     """
 
     try:
-        # Unique filename per request
-        output_file = f"sticker_{uuid.uuid4().hex}.webp"
-
         # Generate sticker image
-        image = generate_sticker_free(prompt)
+        image = await asyncio.to_thread(generate_sticker_free, prompt)
 
-        # Create animated WebP
-        create_animated_webp(image, animation, output_file)
+        # Create animated WebP in memory (no temp file to write, read back and clean up)
+        buffer = io.BytesIO()
+        await asyncio.to_thread(create_animated_webp, image, animation, buffer)
 
-        return FileResponse(
-            path=output_file,
+        return Response(
+            content=buffer.getvalue(),
             media_type="image/webp",
-            filename="whatsapp_sticker.webp"
+            headers=STICKER_HEADERS
         )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    finally:
-        # Optional cleanup (delete after response is sent)
-        if os.path.exists(output_file):
-            pass  # keep file if you want caching
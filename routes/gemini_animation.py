@@ -1,19 +1,17 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 import os
-import uuid
 import shutil
+import asyncio
+import tempfile
 
 from controllers.gemini_animation import generate_animated_sticker
 
 router = APIRouter()
 
-TEMP_DIR = "temp_refs"
-os.makedirs(TEMP_DIR, exist_ok=True)
-
-
 @router.post("/generate-gemni-animation")
-def generate_gemini_animation(
+async def generate_gemini_animation(
     concept: str = Form(..., description="Animation concept"),
     frames: int = Form(
         3,
@@ -43,20 +41,23 @@ def generate_gemini_animation(
             detail="GEMINI_API_KEY is not set"
         )
 
-    output_file = f"gemini_animation_{uuid.uuid4().hex}.webp"
+    # Reference upload + output in one per-request dir, removed once the response is sent
+    work_dir = tempfile.mkdtemp(prefix="gif_")
+    output_file = os.path.join(work_dir, "gemini_animation.webp")
     reference_path = None
 
     try:
         # Save reference image if provided
         if reference_image:
             reference_path = os.path.join(
-                TEMP_DIR,
-                f"{uuid.uuid4().hex}_{reference_image.filename}"
+                work_dir,
+                f"reference_{os.path.basename(reference_image.filename or 'image')}"
             )
             with open(reference_path, "wb") as buffer:
-                shutil.copyfileobj(reference_image.file, buffer)
+                await asyncio.to_thread(shutil.copyfileobj, reference_image.file, buffer)
 
-        result_path = generate_animated_sticker(
+        result_path = await asyncio.to_thread(
+            generate_animated_sticker,
             concept=concept,
             reference_image=reference_path,
             num_frames=frames,
@@ -68,13 +69,10 @@ def generate_gemini_animation(
         return FileResponse(
             path=result_path,
             media_type="image/webp",
-            filename="whatsapp_sticker.webp"
+            filename="whatsapp_sticker.webp",
+            background=BackgroundTask(shutil.rmtree, work_dir, ignore_errors=True)
         )
 
     except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
         raise HTTPException(status_code=500, detail=str(e))
-
-    finally:
-        # Cleanup reference image
-        if reference_path and os.path.exists(reference_path):
-            os.remove(reference_path)
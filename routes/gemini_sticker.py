@@ -1,8 +1,10 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse
-import uuid
+from fastapi.responses import Response
+import io
 import os
 import shutil
+import asyncio
+import tempfile
 
 from controllers.gemini_sticker import (
     generate_sticker,
@@ -11,12 +13,11 @@ from controllers.gemini_sticker import (
 
 router = APIRouter()
 
-TEMP_DIR = "temp_uploads"
-os.makedirs(TEMP_DIR, exist_ok=True)
+STICKER_HEADERS = {"Content-Disposition": 'attachment; filename="whatsapp_sticker.webp"'}
 
 
 @router.post("/generate")
-def generate_gemini_sticker(
+async def generate_gemini_sticker(
     prompt: str = Form(..., description="Sticker prompt"),
     animation: str = Form(
         "float",
@@ -38,42 +39,41 @@ def generate_gemini_sticker(
             detail="GEMINI_API_KEY is not set"
         )
 
-    output_file = f"gemini_sticker_{uuid.uuid4().hex}.webp"
-    reference_path = None
-
     try:
-        # Save reference image if provided
-        if reference_image:
-            reference_path = os.path.join(
-                TEMP_DIR,
-                f"{uuid.uuid4().hex}_{reference_image.filename}"
-            )
-            with open(reference_path, "wb") as buffer:
-                shutil.copyfileobj(reference_image.file, buffer)
+        # Per-request dir for the reference upload, removed on exit
+        with tempfile.TemporaryDirectory(prefix="gif_") as work_dir:
+            reference_path = None
 
-        # Generate sticker image (PIL Image)
-        sticker_image = generate_sticker(
-            prompt=prompt,
-            reference_image_path=reference_path
-        )
+            # Save reference image if provided
+            if reference_image:
+                reference_path = os.path.join(
+                    work_dir,
+                    f"reference_{os.path.basename(reference_image.filename or 'image')}"
+                )
+                with open(reference_path, "wb") as buffer:
+                    await asyncio.to_thread(shutil.copyfileobj, reference_image.file, buffer)
 
-        # Create animated WebP
-        create_animated_webp(
+            # Generate sticker image (PIL Image)
+            sticker_image = await asyncio.to_thread(
+                generate_sticker,
+                prompt=prompt,
+                reference_image_path=reference_path
+            )
+
+        # Create animated WebP in memory
+        buffer = io.BytesIO()
+        await asyncio.to_thread(
+            create_animated_webp,
             image=sticker_image,
             animation=animation,
-            output_path=output_file
+            output_path=buffer
         )
 
-        return FileResponse(
-            path=output_file,
+        return Response(
+            content=buffer.getvalue(),
             media_type="image/webp",
-            filename="whatsapp_sticker.webp"
+            headers=STICKER_HEADERS
         )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    finally:
-        # Cleanup temp reference image
-        if reference_path and os.path.exists(reference_path):
-            os.remove(reference_path)
@@ -1,47 +1,18 @@
-
-
-# from fastapi import APIRouter, HTTPException
-# from fastapi.responses import FileResponse
-# from pydantic import BaseModel
-# from controllers.image_generation import generate_image
-#
-# router = APIRouter(prefix="/image", tags=["Image Generation"])
-#
-#
-# class ImageRequest(BaseModel):
-#     prompt: str
-#     width: int
-#     height: int
-#
-#
-# @router.post("/generate-image")
-# def generate_image_route(payload: ImageRequest):
-#     try:
-#         file_path = generate_image(
-#             prompt=payload.prompt,
-#             width=payload.width,
-#             height=payload.height,
-#         )
-#
-#         return FileResponse(file_path, media_type="image/jpeg", filename="generated_image.jpg")
-#
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e))
-
-
-############################
-
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+from typing import Literal
 from controllers.image_generation import generate_image
 
 router = APIRouter(prefix="/image", tags=["Image Generation"])
 
 
 class ImageRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
     prompt: str
-    aspect_ratio: str
+    # Same keys as controllers.image_generation.ASPECT_RATIOS → rejected at validation, not in the controller
+    aspect_ratio: Literal["1:1", "16:9", "9:16", "4:3", "3:4", "21:9", "2:3", "3:2"]
 
 
 @router.post("/generate-image")
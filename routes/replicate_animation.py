@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Query, HTTPException
 from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 import os
-import uuid
+import shutil
+import asyncio
+import tempfile
 
 from controllers.replicate_animation import generate_animated_sticker
 
@@ -11,7 +14,7 @@ router = APIRouter(
 
 
 @router.get("/generate-replicate-animation")
-def generate_replicate_animation(
+async def generate_replicate_animation(
     concept: str = Query(..., description="Animation concept"),
     frames: int = Query(
         4,
@@ -37,22 +40,26 @@ def generate_replicate_animation(
             detail="REPLICATE_API_TOKEN is not set"
         )
 
-    # Unique output filename per request
-    output_file = f"replicate_animation_{uuid.uuid4().hex}.webp"
+    # All artifacts in one per-request dir, removed once the response is sent
+    work_dir = tempfile.mkdtemp(prefix="gif_")
+    output_file = os.path.join(work_dir, "replicate_animation.webp")
 
     try:
         # Controller handles everything
-        result_path = generate_animated_sticker(
+        result_path = await asyncio.to_thread(
+            generate_animated_sticker,
             concept=concept,
             num_frames=frames,
-            cleanup=True
+            output_file=output_file
         )
 
         return FileResponse(
             path=result_path,
             media_type="image/webp",
-            filename="whatsapp_sticker.webp"
+            filename="whatsapp_sticker.webp",
+            background=BackgroundTask(shutil.rmtree, work_dir, ignore_errors=True)
         )
 
     except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
         raise HTTPException(status_code=500, detail=str(e))
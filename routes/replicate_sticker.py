@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Query, HTTPException
-from fastapi.responses import FileResponse
-import uuid
+from fastapi.responses import Response
+import io
 import os
+import asyncio
+import tempfile
 
 from controllers.replicate_sticker import (
     generate_sticker,
@@ -15,10 +17,11 @@ router = APIRouter()
 # Fixed animation settings
 FRAMES = 20
 FPS = 15
+STICKER_HEADERS = {"Content-Disposition": 'attachment; filename="whatsapp_sticker.webp"'}
 
 
 @router.get("/generate-replicate-sticker")
-def generate_replicate_sticker(
+async def generate_replicate_sticker(
     prompt: str = Query(..., description="Sticker prompt"),
     animation: str = Query(
         "bounce",
@@ -36,31 +39,30 @@ def generate_replicate_sticker(
             detail="REPLICATE_API_TOKEN is not set"
         )
 
-    output_file = f"replicate_sticker_{uuid.uuid4().hex}.webp"
-
     try:
-        # Generate base image
-        image_path = generate_sticker(prompt)
+        # Per-request dir for the downloaded base image (concurrent requests no longer share one file)
+        with tempfile.TemporaryDirectory(prefix="gif_") as work_dir:
+            # Generate base image
+            image_path = await asyncio.to_thread(
+                generate_sticker, prompt, os.path.join(work_dir, "base.png")
+            )
 
-        # Create animated WebP (fixed frames & fps)
-        create_animated_webp(
-            image_path=image_path,
-            output_path=output_file,
-            animation=animation,
-            frames=FRAMES,
-            fps=FPS
-        )
+            # Create animated WebP in memory (fixed frames & fps)
+            buffer = io.BytesIO()
+            await asyncio.to_thread(
+                create_animated_webp,
+                image_path=image_path,
+                output_path=buffer,
+                animation=animation,
+                frames=FRAMES,
+                fps=FPS
+            )
 
-        return FileResponse(
-            path=output_file,
+        return Response(
+            content=buffer.getvalue(),
             media_type="image/webp",
-            filename="whatsapp_sticker.webp"
+            headers=STICKER_HEADERS
         )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    finally:
-        # Cleanup temp image
-        if os.path.exists("temp_sticker.png"):
-            os.remove("temp_sticker.png")
\ No newline at end of file
@@ -3,26 +3,45 @@ Routes for Video Sticker Generation
 
 API 1: POST /generate-sticker
     - Generate video ONCE
-    - Save both files
-    - Return original MP4 + task_id
+    - Return JSON {task_id, original_url, transparent_url} as soon as the MP4 is downloaded
+    - Transparent WebP keeps converting in the background
 
-API 2: GET /get-transparent/{task_id}
-    - Return transparent WebP
-    - Auto-delete both files after
+API 2: GET /media/{task_id}/{kind}   (kind = original | transparent)
+    - One Range/ETag-aware handler for both files
+    - transparent waits for the conversion if it is running in this worker;
+      from another worker it is 202 + Retry-After while pending, 500 if it failed
+    - Files are swept when the task expires (or is evicted)
 """
 
 import os
+import re
+import stat
+import base64
 import asyncio
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel, Field
 from typing import Literal
-from controllers.video_model_animation import generate_runware_transparent_sticker,generate_runware_video_only
+from controllers.video_model_animation import generate_runware_original_video, make_transparent_sticker, generate_runware_video_only
+from controllers import _task_store as task_store
 
 router = APIRouter()
 
-# Store task paths (use Redis/DB in production)
-task_storage = {}
+SWEEP_INTERVAL = 300  # seconds between expired-task sweeps (the reaper's idle timeout)
+CACHE_CONTROL = "private, max-age=300"  # generated files never change under a task_id
+HEAD_BYTES = 64  # leading bytes kept in the task store for Range probes (RIFF/VP8X headers fit)
+RETRY_AFTER = 5  # seconds a client should wait before re-polling a pending transparent WebP
+
+# task_id → asyncio.Task still converting that task's MP4 in this worker
+_conversions = {}
+# kind → (media type, download filename) served by GET /media/{task_id}/{kind}
+MEDIA_KINDS = {
+    "original": ("video/mp4", "sticker_original.mp4"),
+    "transparent": ("image/webp", "sticker_transparent.webp"),
+}
+# Batches of file paths to unlink, drained by the single _reaper coroutine
+_reap_queue = asyncio.Queue()
+_reaper_task = None
 
 
 class VideoGenerationRequest(BaseModel):
@@ -30,87 +49,260 @@ class VideoGenerationRequest(BaseModel):
     duration: int = Field(default=3, ge=1, le=10, description="Video duration in seconds (1-10)")
 
 
-def cleanup_files(task_id: str):
-    """Background task to cleanup files after response is sent."""
-    import time
-    time.sleep(5)  # Wait 5 seconds to ensure file is sent
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for 304)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _stat_result(size: int, mtime: float) -> os.stat_result:
+    """Rebuild the stat FileResponse needs (regular file, size, mtime) from the task store."""
+    return os.stat_result((stat.S_IFREG | 0o644, 0, 0, 1, 0, 0, size, mtime, mtime, mtime))
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _task_files(paths: dict) -> list:
+    """Every *_path entry of a task (size/mtime/head fields are skipped)."""
+    return [path for key, path in paths.items() if key.endswith("_path")]
+
+
+def _remove_all(paths: list) -> None:
+    for path in paths:
+        _remove_quietly(path)
+
+
+def _read_head(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(HEAD_BYTES)
+
+
+def _file_fields(kind: str, path: str) -> dict:
+    """
+    Stat a finished file once for the task store, so GETs need no stat() for
+    Content-Length / Last-Modified / Range (plus its first bytes, so Range probes skip the file).
+    """
+    st = os.stat(path)
+    return {
+        f"{kind}_path": path,
+        f"{kind}_size": st.st_size,
+        f"{kind}_mtime": st.st_mtime,
+        f"{kind}_head": base64.b64encode(_read_head(path)).decode("ascii")
+    }
+
+
+def _head_range_response(request: Request, paths: dict, kind: str, media_type: str, headers: dict):
+    """
+    Answer a single Range inside the stored head (e.g. the `bytes=0-0` probe <img>/<video>
+    parsers send first) without opening the file; None for anything else.
+    """
+    match = re.fullmatch(r"bytes=(\d+)-(\d+)", request.headers.get("range", "").strip())
+    if_range = request.headers.get("if-range")
+    if not match or f"{kind}_head" not in paths or (if_range and if_range != headers["ETag"]):
+        return None
+
+    head = base64.b64decode(paths[f"{kind}_head"])
+    size = paths[f"{kind}_size"]
+    start, end = int(match[1]), int(match[2])
+    if not start <= end < min(len(head), size):
+        return None
 
-    if task_id in task_storage:
-        paths = task_storage[task_id]
-        for path in paths.values():
-            if os.path.exists(path):
-                os.remove(path)
-        del task_storage[task_id]
-        print(f"Cleaned up task: {task_id}")
+    return Response(
+        head[start:end + 1],
+        status_code=206,
+        media_type=media_type,
+        headers={
+            **headers,
+            "Accept-Ranges": "bytes",
+            "Content-Range": f"bytes {start}-{end}/{size}",
+        }
+    )
+
+
+async def _publish(task_id: str, paths: dict) -> None:
+    """Write a task to the store (SQLite, shared across workers, expires after an hour)."""
+    evicted = await asyncio.to_thread(task_store.put, task_id, paths)
+    # Store is full → the oldest tasks were dropped; their files go with them
+    for old_paths in evicted:
+        _reap_queue.put_nowait(_task_files(old_paths))
+
+
+async def _convert(task_id: str, original: dict) -> dict:
+    """
+    Build the transparent WebP and add it to the task's row; a failure is stored in the row
+    too (transparent_status/transparent_error), so every worker's GET can report it.
+    """
+    try:
+        transparent_video_path = await make_transparent_sticker(task_id, original["original_path"])
+        paths = {
+            **original,
+            **await asyncio.to_thread(_file_fields, "transparent", transparent_video_path),
+            "transparent_status": "ready",
+        }
+    except Exception as e:
+        print(f"❌ Transparent conversion failed for {task_id}: {e}")
+        paths = {**original, "transparent_status": "failed", "transparent_error": str(e)}
+    await _publish(task_id, paths)
+    return paths
+
+
+async def _reaper():
+    """
+    The only place files are unlinked: drain everything queued so far, add the files of tasks
+    whose GET never came (every SWEEP_INTERVAL), and remove the batch in one worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    next_sweep = loop.time()
+
+    while True:
+        batch = []
+        try:
+            batch += await asyncio.wait_for(_reap_queue.get(), max(0, next_sweep - loop.time()))
+        except asyncio.TimeoutError:
+            pass
+        while not _reap_queue.empty():
+            batch += _reap_queue.get_nowait()
+
+        if loop.time() >= next_sweep:
+            for paths in await asyncio.to_thread(task_store.pop_expired):
+                batch += _task_files(paths)
+            next_sweep = loop.time() + SWEEP_INTERVAL
+
+        if batch:
+            await asyncio.to_thread(_remove_all, batch)
+
+
+def start_reaper() -> None:
+    """Start this worker's reaper once (called from the app's startup hook)."""
+    global _reaper_task
+    if _reaper_task is None:
+        _reaper_task = asyncio.create_task(_reaper())
+
+
+async def stop_reaper() -> None:
+    """Cancel the reaper on shutdown (queued batches are left to the next sweep), then close the store."""
+    global _reaper_task
+    if _reaper_task is not None:
+        _reaper_task.cancel()
+        try:
+            await _reaper_task
+        except asyncio.CancelledError:
+            pass
+        _reaper_task = None
+    task_store.close()
 
 
 # ============================================================
-# API 1: Generate and return original video + task_id
+# API 1: Generate original video → task_id + media URLs
 # ============================================================
 
 @router.post("/generate-video-original-by-video-model")
 async def generate_sticker(request: VideoGenerationRequest):
     """
-    Generate video, save both files, return original MP4 + task_id.
-    Use task_id to get transparent version later.
+    Generate video, return task_id + URLs for both files right away.
+    The transparent version is built in the background.
     """
     try:
-        original_video_path, transparent_video_path = await generate_runware_transparent_sticker(
+        task_id, original_video_path = await generate_runware_original_video(
             prompt=request.prompt,
             duration=request.duration
         )
 
-        # Extract task_id from filename
-        filename = os.path.basename(original_video_path)
-        task_id = filename.replace("_original.mp4", "")
+        # The MP4 is fetchable (from any worker) while background removal runs on it
+        original = await asyncio.to_thread(_file_fields, "original", original_video_path)
+        await _publish(task_id, {**original, "transparent_status": "pending"})
 
-        # Store paths
-        task_storage[task_id] = {
-            "transparent_path": transparent_video_path,
-            "original_path": original_video_path
-        }
+        conversion = _conversions[task_id] = asyncio.create_task(_convert(task_id, original))
+        conversion.add_done_callback(lambda _: _conversions.pop(task_id, None))
 
-        response = FileResponse(
-            original_video_path,
-            media_type="video/mp4",
-            filename="sticker_original.mp4"
-        )
-        response.headers["X-Task-ID"] = task_id
-
-        return response
+        return {
+            "task_id": task_id,
+            "original_url": f"/media/{task_id}/original",
+            "transparent_url": f"/media/{task_id}/transparent",
+        }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # ============================================================
-# API 2: Get transparent video + AUTO CLEANUP
+# API 2: Get original / transparent file by task_id
 # ============================================================
 
-@router.get("/get-transparent-video-by-video-model/{task_id}")
-async def get_transparent(task_id: str, background_tasks: BackgroundTasks):
+@router.get("/media/{task_id}/{kind}")
+async def get_media(task_id: str, kind: Literal["original", "transparent"], request: Request):
     """
-    Get transparent WebP using task_id.
-    Files are automatically deleted after download.
+    Get a task's original MP4 or transparent WebP.
+    Repeat GETs with If-None-Match get a 304 (ETag is task_id + kind);
+    small Range probes are served from the task store.
     """
-    if task_id not in task_storage:
+    conversion = _conversions.get(task_id) if kind == "transparent" else None
+    if conversion is not None:
+        # Still converting in this worker → wait for it (shielded: a client disconnect doesn't cancel it)
+        try:
+            paths = await asyncio.shield(conversion)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    else:
+        # SQLite lookup and any stat() run in the threadpool, off the event loop
+        paths = await asyncio.to_thread(task_store.get, task_id)
+
+    if paths is None:
         raise HTTPException(status_code=404, detail="Task not found. Generate first.")
 
-    transparent_path = task_storage[task_id]["transparent_path"]
+    if kind == "transparent":
+        # Row written by another worker that is still converting (or whose conversion failed)
+        status = paths.get("transparent_status")
+        if status == "pending":
+            return Response(status_code=202, headers={"Retry-After": str(RETRY_AFTER)})
+        if status == "failed":
+            raise HTTPException(status_code=500, detail=paths.get("transparent_error", "Conversion failed"))
+
+    media_type, filename = MEDIA_KINDS[kind]
+    cache_headers = {"ETag": f'"{task_id}-{kind}"', "Cache-Control": CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match"), cache_headers["ETag"]):
+        return Response(status_code=304, headers=cache_headers)
+
+    probe = _head_range_response(request, paths, kind, media_type, cache_headers)
+    if probe is not None:
+        return probe
 
-    if not os.path.exists(transparent_path):
+    path = paths.get(f"{kind}_path")
+    if not path:
         raise HTTPException(status_code=404, detail="File not found")
 
-    # Auto cleanup after file is sent
-    # background_tasks.add_task(cleanup_files, task_id)
+    # The reaper drops the row before unlinking, so a live row means the file is still there
+    if f"{kind}_size" in paths:
+        stat_result = _stat_result(paths[f"{kind}_size"], paths[f"{kind}_mtime"])
+    else:
+        try:
+            stat_result = await asyncio.to_thread(os.stat, path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="File not found")
 
     return FileResponse(
-        transparent_path,
-        media_type="image/webp",
-        filename="sticker_transparent.webp"
+        path,
+        media_type=media_type,
+        filename=filename,
+        content_disposition_type="inline",  # plays in <video>/<img> instead of a download dialog
+        headers=cache_headers,
+        stat_result=stat_result,
     )
 
 
+@router.get("/get-transparent-video-by-video-model/{task_id}")
+async def get_transparent(task_id: str, request: Request):
+    """Get transparent WebP using task_id (same as GET /media/{task_id}/transparent)."""
+    return await get_media(task_id, "transparent", request)
+
+
 class VideoOnlyRequest(BaseModel):
     prompt: str
     duration: int = Field(ge=1, le=10)
@@ -134,7 +326,8 @@ async def generate_video(request: VideoOnlyRequest):
         return FileResponse(
             video_path,
             media_type="video/mp4",
-            filename="generated_video.mp4"
+            filename="generated_video.mp4",
+            content_disposition_type="inline"
         )
 
     except Exception as e:
@@ -5,31 +5,85 @@ Integrates all sticker generation functions into a beautiful local UI
 
 import os
 import sys
+import json
+import math
+import shutil
 import asyncio
+import time
+import hashlib
+import importlib
 import threading
 from pathlib import Path
+from dataclasses import dataclass
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QLineEdit, QComboBox, QTabWidget,
     QFrame, QFileDialog, QSpinBox, QMessageBox, QProgressBar,
-    QGroupBox, QGridLayout, QScrollArea, QSizePolicy
+    QGroupBox, QGridLayout, QScrollArea, QSizePolicy, QCheckBox,
+    QButtonGroup, QToolButton
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSize
-from PyQt6.QtGui import QPixmap, QFont, QIcon, QPalette, QColor, QMovie
-
-# Import controllers
-from controllers.free_sticker import generate_sticker_free, create_animated_webp as free_create_animated
-from controllers.free_animation import generate_animated_sticker as free_animated_sticker
-from controllers.replicate_sticker import generate_sticker as replicate_generate, \
-    create_animated_webp as replicate_create_animated
-from controllers.replicate_animation import generate_animated_sticker as replicate_animated_sticker
-from controllers.gemini_sticker import generate_sticker as gemini_generate, \
-    create_animated_webp as gemini_create_animated
-from controllers.gemini_animation import generate_animated_sticker as gemini_animated_sticker
-from controllers.video_model_animation import generate_runware_transparent_sticker,generate_runware_video_only
-from controllers.image_generation import generate_image
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal, QSize
+from PyQt6.QtGui import QPixmap, QFont, QIcon, QPalette, QColor, QMovie, QPainter, QImage, QImageReader, QPixmapCache
+
+# Controllers are imported on first use: each pulls in PIL / rembg / provider SDKs,
+# so the window paints with only PyQt6 loaded (and a missing SDK fails just its own task)
+CONTROLLERS = {
+    "generate_sticker_free": ("controllers.free_sticker", "generate_sticker_free"),
+    "free_create_animated": ("controllers.free_sticker", "create_animated_webp"),
+    "free_animated_sticker": ("controllers.free_animation", "generate_animated_sticker"),
+    "replicate_generate": ("controllers.replicate_sticker", "generate_sticker"),
+    "replicate_create_animated": ("controllers.replicate_sticker", "create_animated_webp"),
+    "replicate_animated_sticker": ("controllers.replicate_animation", "generate_animated_sticker"),
+    "gemini_generate": ("controllers.gemini_sticker", "generate_sticker"),
+    "gemini_create_animated": ("controllers.gemini_sticker", "create_animated_webp"),
+    "gemini_animated_sticker": ("controllers.gemini_animation", "generate_animated_sticker"),
+    "generate_runware_transparent_sticker": ("controllers.video_model_animation", "generate_runware_transparent_sticker"),
+    "generate_runware_video_only": ("controllers.video_model_animation", "generate_runware_video_only"),
+    "close_runware": ("controllers.video_model_animation", "close_runware"),
+    "generate_image": ("controllers.image_generation", "generate_image"),
+    "load_reference_image": ("controllers._reference", "load_reference_image"),
+    "prepare_reference_file": ("controllers._reference", "prepare_reference_file"),
+}
+_controllers = {}
+
+
+def _controller(name: str):
+    """Import a controller function on first use; later calls skip the import system."""
+    if name not in _controllers:
+        module, attr = CONTROLLERS[name]
+        _controllers[name] = getattr(importlib.import_module(module), attr)
+    return _controllers[name]
+# ============== ASYNC LOOP ==============
+# One long-lived asyncio loop thread for the async (Runware) controllers, started on first use
+_aio_loop = None
+_aio_lock = threading.Lock()
+
+
+def run_async(coro):
+    """Run a coroutine on the shared loop thread and block (in a worker) until it finishes."""
+    global _aio_loop
+    with _aio_lock:
+        if _aio_loop is None:
+            _aio_loop = asyncio.new_event_loop()
+            threading.Thread(target=_aio_loop.run_forever, name="asyncio-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _aio_loop).result()
+
+
+def stop_async_loop():
+    """Disconnect Runware on the shared loop, then stop it (app shutdown)."""
+    if _aio_loop is None:
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(_controller("close_runware")(), _aio_loop).result(timeout=5)
+    except Exception as e:
+        print(f"⚠️ Runware disconnect failed: {e}")
+    _aio_loop.call_soon_threadsafe(_aio_loop.stop)
+
+
 # ============== STYLE CONSTANTS ==============
 DARK_BG = "#1a1a2e"
 DARKER_BG = "#16213e"
@@ -42,6 +96,103 @@ BORDER_COLOR = "#2d2d5a"
 SUCCESS_COLOR = "#22c55e"
 WARNING_COLOR = "#f59e0b"
 
+# Stylesheet palettes by theme name ("dark" is the one the widgets' inline styles use)
+THEMES = {
+    "dark": dict(
+        DARK_BG=DARK_BG, DARKER_BG=DARKER_BG, CARD_BG=CARD_BG,
+        ACCENT_COLOR=ACCENT_COLOR, ACCENT_HOVER=ACCENT_HOVER,
+        TEXT_COLOR=TEXT_COLOR, TEXT_SECONDARY=TEXT_SECONDARY,
+        BORDER_COLOR=BORDER_COLOR, SUCCESS_COLOR=SUCCESS_COLOR, WARNING_COLOR=WARNING_COLOR,
+    ),
+}
+
+# Dark application palette (QColor is a plain value type → built once at import, no QApplication needed)
+PALETTE_COLORS = (
+    (QPalette.ColorRole.Window, QColor(DARK_BG)),
+    (QPalette.ColorRole.WindowText, QColor(TEXT_COLOR)),
+    (QPalette.ColorRole.Base, QColor(DARKER_BG)),
+    (QPalette.ColorRole.AlternateBase, QColor(CARD_BG)),
+    (QPalette.ColorRole.Text, QColor(TEXT_COLOR)),
+    (QPalette.ColorRole.Button, QColor(CARD_BG)),
+    (QPalette.ColorRole.ButtonText, QColor(TEXT_COLOR)),
+    (QPalette.ColorRole.Highlight, QColor(ACCENT_COLOR)),
+    (QPalette.ColorRole.HighlightedText, QColor(TEXT_COLOR)),
+)
+
+
+# Generator cards: one checkable QToolButton per entry, first one selected
+STICKER_GENERATORS = [
+    {"name": "Free Sticker", "description": "Powered by Flux Model", "icon": "✨", "free": True},
+    {"name": "Replicate Sticker", "description": "High quality generation", "icon": "🎨", "free": False},
+    {"name": "Gemini Sticker", "description": "With optional image reference", "icon": "🤖", "free": False},
+]
+
+ANIMATION_GENERATORS = [
+    {"name": "Free Animation", "description": "GPT + Pollinations", "icon": "✨", "free": True},
+    {"name": "Replicate Animation", "description": "GPT + Replicate", "icon": "🎨", "free": False},
+    {"name": "Gemini Animation", "description": "GPT + Gemini", "icon": "🤖", "free": False},
+]
+
+
+@dataclass(frozen=True)
+class TabSpec:
+    """Declarative description of a generator tab (built by StickerGeneratorApp.build_tab)."""
+    title: str
+    key: str  # attribute prefix: self.{key}_prompt / _generate_btn / _progress / _status / _use_cache
+    panel_type: str  # preview panel
+    prompt_label: str
+    prompt_placeholder: str
+    button_text: str
+    on_generate: str  # method names on StickerGeneratorApp
+    build_settings: str
+    hint: str = None
+    info: str = None
+    badge: tuple = None  # (text, background, text color)
+    generators: list = None
+    on_generator_selected: str = None
+
+
+TABS = [
+    TabSpec(
+        title="💜 Stickers", key="sticker", panel_type="sticker",
+        generators=STICKER_GENERATORS, on_generator_selected="on_sticker_generator_selected",
+        prompt_label="Prompt", prompt_placeholder="a person is going to school...",
+        hint="Describe what you want your sticker to show",
+        build_settings="build_sticker_settings",
+        button_text="🎨 Generate Free Sticker", on_generate="generate_sticker",
+    ),
+    TabSpec(
+        title="🎬 Animations", key="animation", panel_type="animation",
+        generators=ANIMATION_GENERATORS, on_generator_selected="on_animation_generator_selected",
+        prompt_label="Animation Concept", prompt_placeholder="a cat freezing into ice...",
+        build_settings="build_animation_settings",
+        button_text="🎬 Generate Free Animation", on_generate="generate_animation",
+    ),
+    TabSpec(
+        title="⭐ Premium Video", key="video", panel_type="video",
+        badge=("⭐ PRO", WARNING_COLOR, "black"),
+        info="Uses Runware Video AI for smooth video-based animations",
+        prompt_label="Video Prompt", prompt_placeholder="A cat becoming frozen, covered in ice...",
+        build_settings="build_video_settings",
+        button_text="⭐ Generate Premium Video", on_generate="generate_video",
+    ),
+    TabSpec(
+        title="🎥 Video Only", key="video_only", panel_type="video",
+        prompt_label="Video Prompt", prompt_placeholder="A cinematic dragon flying through clouds...",
+        build_settings="build_video_only_settings",
+        button_text="🎥 Generate Video", on_generate="generate_video_only",
+    ),
+    TabSpec(
+        title="🖼️ Image Gen", key="image", panel_type="image",
+        badge=("🆓 FREE", SUCCESS_COLOR, "white"),
+        info="Generate images using Pollinations.ai (Flux Model) - No API key required!",
+        prompt_label="Prompt", prompt_placeholder="A beautiful sunset over mountains...",
+        hint="Describe the image you want to generate",
+        build_settings="build_image_settings",
+        button_text="🖼️ Generate Image", on_generate="generate_image",
+    ),
+]
+
 
 VIDEO_ONLY_ASPECT_RATIOS = {
     "16:9 – 480p": "16:9_480p",
@@ -61,7 +212,127 @@ VIDEO_ONLY_ASPECT_RATIOS = {
 
 
 
-STYLESHEET = f"""
+MAX_WORKERS = 4  # generations that can run at once (one per tab is the usual case)
+PROGRESS_INTERVAL = 0.05  # seconds; progress messages are throttled to 20 Hz
+CLICK_DEBOUNCE_MS = 300  # Generate stays disabled this long after a job ends (absorbs stray double-clicks)
+MAX_IMAGE_COUNT = 10  # images per Image Gen batch (parallel requests to Pollinations)
+ANIMATED_SUFFIXES = (".webp", ".gif")  # previewed with QMovie (one C-level endswith over the tuple)
+NON_STILL_SUFFIXES = ANIMATED_SUFFIXES + (".mp4",)
+PIXMAP_CACHE_KB = 65536  # QPixmapCache budget for decoded, scaled still previews
+IMAGE_SEED = 42  # first image's seed; batch image i uses IMAGE_SEED + i for variety
+
+
+# ============== OUTPUT CACHE ==============
+# Finished outputs keyed by sha256(task type + settings) → identical requests skip the API round-trip
+CACHE_DIR = Path(os.environ.get("STICKER_CACHE_DIR", Path.home() / ".sticker_cache"))
+REF_CACHE_DIR = CACHE_DIR / "refs"  # downscaled reference images, keyed by source content hash
+CACHE_MAX_BYTES = int(os.environ.get("STICKER_CACHE_MAX_MB", 2048)) * 1024 * 1024  # least recently used entries beyond this are pruned
+
+
+def _cache_key(task_type: str, params: dict) -> str:
+    """
+    Hash a task's settings; a reference image counts by path + mtime + size, not its bytes.
+    Only Gemini tasks use the reference, and a missing file hashes as none (they skip it too).
+    """
+    keyed = {k: v for k, v in params.items() if k not in ("use_cache", "output_file")}
+    reference = keyed.pop("reference_image", None)
+    if reference and task_type.startswith("gemini_"):
+        try:
+            st = os.stat(reference)
+            keyed["reference_image"] = [os.path.abspath(reference), st.st_mtime, st.st_size]
+        except FileNotFoundError:
+            pass
+    payload = json.dumps([task_type, keyed], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _cache_lookup(key: str) -> Optional[str]:
+    """
+    Copy a key's cached outputs back to the paths the original run wrote (so status text and
+    the Save dialog show real names, not hashes); `|`-joined like WorkerRunnable results, None on a miss.
+    """
+    manifest = CACHE_DIR / f"{key}.json"
+    try:
+        originals = json.loads(manifest.read_text())
+        restored = []
+        for i, original in enumerate(originals):
+            cached = CACHE_DIR / f"{key}.{i}{Path(original).suffix}"
+            os.makedirs(os.path.dirname(original), exist_ok=True)
+            shutil.copyfile(cached, original)  # a copy, not a link: later runs rewrite outputs in place
+            os.utime(cached)  # mtime = last use, for _cache_prune
+            restored.append(original)
+        os.utime(manifest)
+    except (OSError, ValueError):  # no entry, or partly pruned → miss
+        return None
+    return "|".join(restored)
+
+
+def _cache_store(key: str, output_path: str) -> None:
+    """
+    Copy each `|`-separated output into the cache (dot-prefixed temp + rename, so no partial hits),
+    then write the manifest of original paths last, which is what makes the entry visible.
+    """
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    originals = [os.path.abspath(part) for part in output_path.split("|")]
+    for i, part in enumerate(originals):
+        name = f"{key}.{i}{Path(part).suffix}"
+        shutil.copy2(part, CACHE_DIR / f".{name}")
+        os.replace(CACHE_DIR / f".{name}", CACHE_DIR / name)
+    (CACHE_DIR / f".{key}.json").write_text(json.dumps(originals))
+    os.replace(CACHE_DIR / f".{key}.json", CACHE_DIR / f"{key}.json")
+    _cache_prune()
+
+
+def _cache_prune() -> None:
+    """Delete whole entries, least recently used first, until the cache fits CACHE_MAX_BYTES."""
+    entries = {}  # key → [last use, bytes, files]
+    for path in CACHE_DIR.iterdir():
+        if path.name.startswith(".") or not path.is_file():  # temp files, refs/
+            continue
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        entry = entries.setdefault(path.name.split(".", 1)[0], [0.0, 0, []])
+        entry[0] = max(entry[0], st.st_mtime)
+        entry[1] += st.st_size
+        entry[2].append(path)
+
+    total = 0
+    for _, size, files in sorted(entries.values(), key=lambda entry: entry[0], reverse=True):
+        total += size
+        if total > CACHE_MAX_BYTES:
+            for path in files:
+                path.unlink(missing_ok=True)
+
+
+@lru_cache(maxsize=None)
+def ui_font(size: int, bold: bool = False) -> QFont:
+    """
+    Shared QFont per (size, weight): resolved by the font database once, then reused by every widget.
+    Built lazily because a QFont needs the QApplication to exist.
+    """
+    return QFont("Segoe UI", size, QFont.Weight.Bold if bold else QFont.Weight.Normal)
+
+
+def read_scaled_image(path: str, size: int) -> QImage:
+    """
+    Decode a still straight to fit a size×size box (JPEG decodes at 1/2..1/8 scale),
+    instead of loading the full-resolution image and shrinking it afterwards.
+    """
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    source = reader.size()
+    if source.isValid():
+        reader.setScaledSize(source.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    if not source.isValid():  # size unknown up front → scale after decoding
+        image = image.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+    return image
+
+
+_STYLESHEET_TEMPLATE = """
 QMainWindow {{
     background-color: {DARK_BG};
 }}
@@ -246,22 +517,25 @@ QFrame#previewFrame {{
     min-height: 300px;
 }}
 
-QFrame#generatorCard {{
+QToolButton#generatorCard {{
     background-color: {CARD_BG};
     border: 2px solid {BORDER_COLOR};
     border-radius: 12px;
     padding: 16px;
 }}
 
-QFrame#generatorCard:hover {{
+QToolButton#generatorCard:hover,
+QToolButton#generatorCard:checked {{
     border-color: {ACCENT_COLOR};
 }}
 
-QFrame#selectedCard {{
-    background-color: {CARD_BG};
-    border: 2px solid {ACCENT_COLOR};
-    border-radius: 12px;
-    padding: 16px;
+QLabel#freeBadge {{
+    background-color: {SUCCESS_COLOR};
+    color: white;
+    padding: 2px 6px;
+    border-radius: 4px;
+    font-size: 9px;
+    font-weight: bold;
 }}
 
 QScrollArea {{
@@ -271,116 +545,121 @@ QScrollArea {{
 """
 
 
-class GeneratorCard(QFrame):
-    """Clickable card for selecting generator type."""
-
-    clicked = pyqtSignal(str)
-
-    def __init__(self, name: str, description: str, icon_text: str, is_free: bool = False):
-        super().__init__()
-        self.name = name
-        self.selected = False
-        self.setObjectName("generatorCard")
-        self.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.setFixedSize(160, 130)
-
-        layout = QVBoxLayout(self)
-        layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.setSpacing(8)
-
-        # Icon
-        icon_label = QLabel(icon_text)
-        icon_label.setFont(QFont("Segoe UI", 24))
-        icon_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(icon_label)
-
-        # Name with FREE badge
-        name_layout = QHBoxLayout()
-        name_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
-        name_label = QLabel(name)
-        name_label.setFont(QFont("Segoe UI", 9, QFont.Weight.Bold))
-        name_label.setWordWrap(True)
-        name_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        name_layout.addWidget(name_label)
-
-        if is_free:
-            free_badge = QLabel("FREE")
-            free_badge.setStyleSheet(f"""
-                background-color: {SUCCESS_COLOR};
-                color: white;
-                padding: 2px 6px;
-                border-radius: 4px;
-                font-size: 9px;
-                font-weight: bold;
-            """)
-            name_layout.addWidget(free_badge)
-
-        layout.addLayout(name_layout)
-
-        # # Description
-        # desc_label = QLabel(description)
-        # desc_label.setFont(QFont("Segoe UI", 9))
-        # desc_label.setStyleSheet(f"color: {TEXT_SECONDARY};")
-        # desc_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        # desc_label.setWordWrap(True)
-        # layout.addWidget(desc_label)
-
-    def mousePressEvent(self, event):
-        self.clicked.emit(self.name)
-
-    def setSelected(self, selected: bool):
-        self.selected = selected
-        self.setObjectName("selectedCard" if selected else "generatorCard")
-        self.style().unpolish(self)
-        self.style().polish(self)
+@lru_cache(maxsize=None)
+def build_stylesheet(theme: str = "dark") -> str:
+    """Application QSS for a theme, interpolated once per theme name."""
+    return _STYLESHEET_TEMPLATE.format(**THEMES[theme])
 
 
-class WorkerThread(QThread):
-    """Background worker for sticker generation."""
+class WorkerSignals(QObject):
+    """Signals for WorkerRunnable (QRunnable is not a QObject)."""
 
     finished = pyqtSignal(str)  # Output path
     error = pyqtSignal(str)  # Error message
     progress = pyqtSignal(str)  # Progress message
 
-    def __init__(self, task_type: str, params: dict):
+
+class WorkerRunnable(QRunnable):
+    """Background sticker generation job, run on the app's QThreadPool."""
+
+    def __init__(self, task_type: str, params: dict, cache_key: Optional[str] = None):
         super().__init__()
         self.task_type = task_type
         self.params = params
+        self.cache_key = cache_key  # already hashed by start_worker → not re-serialized in run()
+        self.preview_size = 0  # physical px; set → a still output's preview is decoded here, off the GUI thread
+        self.thumbnail = None
+        self.panels = set()  # panel types whose handlers are connected to this job's signals
+        self.signals = WorkerSignals()
+        self._last_progress = 0.0
+        self._pending_progress = None  # newest message held back inside the current window
+        self._flush_timer = None
+        self._progress_lock = threading.Lock()
+
+    def emit_progress(self, message: str, final: bool = False):
+        """
+        Progress to the UI at most every PROGRESS_INTERVAL (bursts would queue a repaint each).
+        Messages inside the window are coalesced: the newest one is sent when it closes.
+        Final / "done" / ✅ messages always go straight through.
+        """
+        final = final or message.startswith("✅") or "done" in message.lower()
+        with self._progress_lock:
+            now = time.monotonic()
+            wait = self._last_progress + PROGRESS_INTERVAL - now
+            if not final and wait > 0:
+                self._pending_progress = message
+                if self._flush_timer is None:
+                    self._flush_timer = threading.Timer(wait, self.flush_progress)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+                return
+            self._pending_progress = None  # superseded by this one
+            self._last_progress = now
+        self.signals.progress.emit(message)
+
+    def flush_progress(self):
+        """Send the held-back message now (window closed, or the job is about to report back)."""
+        with self._progress_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            message, self._pending_progress = self._pending_progress, None
+            if message is None:
+                return
+            self._last_progress = time.monotonic()
+        self.signals.progress.emit(message)
+
+    def emit_error(self, message: str):
+        self.flush_progress()
+        self.signals.error.emit(message)
+
+    def emit_finished(self, output_path: str):
+        self.flush_progress()
+        if self.preview_size and "|" not in output_path and not output_path.endswith(NON_STILL_SUFFIXES):
+            self.thumbnail = read_scaled_image(output_path, self.preview_size)
+        self.signals.finished.emit(output_path)
 
     def run(self):
         try:
             output_path = None
 
+            key = self.cache_key or _cache_key(self.task_type, self.params)
+            if self.params.get("use_cache", True):
+                cached = _cache_lookup(key)
+                if cached:
+                    self.emit_progress("♻️ Using cached result...")
+                    self.emit_finished(cached)
+                    return
+
             # ===== STICKERS TAB =====
             if self.task_type == "free_sticker":
-                self.progress.emit("Generating sticker with Pollinations.ai...")
-                image = generate_sticker_free(self.params["prompt"])
-                self.progress.emit("Creating animated WebP...")
-                output_path = free_create_animated(
+                self.emit_progress("Generating sticker with Pollinations.ai...")
+                image = _controller("generate_sticker_free")(self.params["prompt"])
+                self.emit_progress("Creating animated WebP...")
+                output_path = _controller("free_create_animated")(
                     image,
                     self.params["animation"],
                     self.params["output_file"]
                 )
 
             elif self.task_type == "replicate_sticker":
-                self.progress.emit("Generating sticker with Replicate...")
-                image_path = replicate_generate(self.params["prompt"])
-                self.progress.emit("Creating animated WebP...")
-                output_path = replicate_create_animated(
+                self.emit_progress("Generating sticker with Replicate...")
+                image_path = _controller("replicate_generate")(self.params["prompt"])
+                self.emit_progress("Creating animated WebP...")
+                output_path = _controller("replicate_create_animated")(
                     image_path,
                     self.params["output_file"],
                     self.params["animation"]
                 )
 
             elif self.task_type == "gemini_sticker":
-                self.progress.emit("Generating sticker with Gemini...")
-                image = gemini_generate(
+                self.emit_progress("Generating sticker with Gemini...")
+                image = _controller("gemini_generate")(
                     self.params["prompt"],
                     self.params.get("reference_image")
                 )
-                self.progress.emit("Creating animated WebP...")
-                output_path = gemini_create_animated(
+                self.emit_progress("Creating animated WebP...")
+                output_path = _controller("gemini_create_animated")(
                     image,
                     self.params["animation"],
                     self.params["output_file"]
@@ -388,8 +667,8 @@ class WorkerThread(QThread):
 
             # ===== ANIMATIONS TAB =====
             elif self.task_type == "free_animation":
-                self.progress.emit("Generating animated sticker (FREE)...")
-                output_path = free_animated_sticker(
+                self.emit_progress("Generating animated sticker (FREE)...")
+                output_path = _controller("free_animated_sticker")(
                     concept=self.params["prompt"],
                     num_frames=self.params["num_frames"],
                     fps=self.params["fps"],
@@ -397,15 +676,15 @@ class WorkerThread(QThread):
                 )
 
             elif self.task_type == "replicate_animation":
-                self.progress.emit("Generating animated sticker with Replicate...")
-                output_path = replicate_animated_sticker(
+                self.emit_progress("Generating animated sticker with Replicate...")
+                output_path = _controller("replicate_animated_sticker")(
                     concept=self.params["prompt"],
                     num_frames=self.params["num_frames"]
                 )
 
             elif self.task_type == "gemini_animation":
-                self.progress.emit("Generating animated sticker with Gemini...")
-                output_path = gemini_animated_sticker(
+                self.emit_progress("Generating animated sticker with Gemini...")
+                output_path = _controller("gemini_animated_sticker")(
                     concept=self.params["prompt"],
                     reference_image=self.params.get("reference_image"),
                     num_frames=self.params["num_frames"],
@@ -415,65 +694,96 @@ class WorkerThread(QThread):
 
             # ===== PREMIUM VIDEO TAB =====
             elif self.task_type == "video_animation":
-                self.progress.emit("Generating video animation with Runware...")
-                # Run async function in sync context
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    original, transparent = loop.run_until_complete(
-                        generate_runware_transparent_sticker(
-                            prompt=self.params["prompt"],
-                            duration=self.params["duration"],
-                            fps=self.params["fps"]
-                        )
+                self.emit_progress("Generating video animation with Runware...")
+                # Async controller → shared loop thread (Runware websocket stays connected between runs)
+                _, original, transparent = run_async(
+                    _controller("generate_runware_transparent_sticker")(
+                        prompt=self.params["prompt"],
+                        duration=self.params["duration"],
+                        fps=self.params["fps"]
                     )
-                    output_path = f"{transparent}|{original}"  # Pass both paths
-                finally:
-                    loop.close()
+                )
+                output_path = f"{transparent}|{original}"  # Pass both paths
 
-                    # ===== IMAGE GENERATION TAB =====
+            # ===== IMAGE GENERATION TAB =====
             elif self.task_type == "image_generation":
-                self.progress.emit("Generating image with Pollinations.ai...")
-                output_path = generate_image(
-                    prompt=self.params["prompt"],
-                    aspect_ratio=self.params["aspect_ratio"],
-                    output_file=self.params["output_file"],
-                )
+                count = self.params.get("count", 1)
+                if count == 1:
+                    self.emit_progress("Generating image with Pollinations.ai...")
+                    output_path = _controller("generate_image")(
+                        prompt=self.params["prompt"],
+                        aspect_ratio=self.params["aspect_ratio"],
+                        output_file=self.params["output_file"],
+                    )
+                else:
+                    # Overlap the N HTTP round-trips instead of running them back to back
+                    self.emit_progress(f"Generating {count} images with Pollinations.ai...")
+                    base, ext = os.path.splitext(self.params["output_file"])
+                    with ThreadPoolExecutor(max_workers=count) as executor:
+                        paths = executor.map(
+                            lambda i: _controller("generate_image")(
+                                prompt=self.params["prompt"],
+                                aspect_ratio=self.params["aspect_ratio"],
+                                output_file=f"{base}_{i}{ext}",
+                                seed=IMAGE_SEED + i,
+                            ),
+                            range(count)
+                        )
+                        output_path = "|".join(paths)  # Pass all paths
 
             elif self.task_type == "video_only":
-                self.progress.emit("Generating video (MP4 only)...")
-
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
+                self.emit_progress("Generating video (MP4 only)...")
 
-                try:
-                    output_path = loop.run_until_complete(
-                        generate_runware_video_only(
-                            prompt=self.params["prompt"],
-                            duration=self.params["duration"],
-                            aspect_ratio=self.params["aspect_ratio"],
-                        )
+                output_path = run_async(
+                    _controller("generate_runware_video_only")(
+                        prompt=self.params["prompt"],
+                        duration=self.params["duration"],
+                        aspect_ratio=self.params["aspect_ratio"],
                     )
-                finally:
-                    loop.close()
+                )
 
             if output_path:
-                self.finished.emit(output_path)
+                try:
+                    _cache_store(key, output_path)
+                except OSError as e:
+                    print(f"⚠️ Could not cache output: {e}")
+                self.emit_finished(output_path)
             else:
-                self.error.emit("No output generated")
+                self.emit_error("No output generated")
 
         except Exception as e:
-            self.error.emit(str(e))
+            self.emit_error(str(e))
+
+
+class CopyRunnable(QRunnable):
+    """Save-dialog copy, run on the app's QThreadPool."""
+
+    def __init__(self, source_path: str, save_path: str):
+        super().__init__()
+        self.source_path = source_path
+        self.save_path = save_path
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            # copyfile already copies in-kernel (sendfile on Linux, fcopyfile on macOS)
+            shutil.copyfile(self.source_path, self.save_path)
+            self.signals.finished.emit(self.save_path)
+        except OSError as e:
+            self.signals.error.emit(str(e))
 
 
 class StickerGeneratorApp(QMainWindow):
     """Main application window."""
 
+    # panel_type → tab key whose Generate button / progress / status show its jobs
+    # (both video tabs report on the Video Only controls)
+    PANEL_CONTROLS = {"sticker": "sticker", "animation": "animation", "image": "image", "video": "video_only"}
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("AI Sticker Generator")
         self.setMinimumSize(1000, 700)
-        self.setStyleSheet(STYLESHEET)
 
         # State
         # State
@@ -487,10 +797,28 @@ class StickerGeneratorApp(QMainWindow):
         self.video_preview_path = None
         self.current_video_mp4_path = None
 
-        self.worker = None
+        # Hot worker threads reused across generations; one in-flight job per tab
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(MAX_WORKERS)
+        self.workers = {}
+        # settings hash → running job, so an identical request joins it instead of calling the API again
+        self._inflight = {}
+        self._last_results = {}  # panel_type → (cache key, output path) of its last successful run
+        self.preview_buffers = {}
+        # picked reference path → Gemini-ready (downscaled) copy, filled in by prefetch_reference_image
+        self.prepared_refs = {}
+        self.copies = set()  # in-flight Save copies
+        pictures = os.path.expanduser("~/Pictures")
+        self.last_ref_dir = pictures if os.path.isdir(pictures) else os.path.expanduser("~")
+        self.last_save_dir = os.getcwd()  # where the old relative-name save dialog opened
+        self.preview_movies = {}  # preview label → ((path, mtime), QMovie) it is currently showing
 
         self.setup_ui()
 
+    def closeEvent(self, event):
+        stop_async_loop()
+        super().closeEvent(event)
+
     def setup_ui(self):
         """Setup the main UI."""
         central_widget = QWidget()
@@ -519,16 +847,17 @@ class StickerGeneratorApp(QMainWindow):
 
         # Tab Widget
         self.tabs = QTabWidget()
-        self.tabs.addTab(self.create_stickers_tab(), "💜 Stickers")
-        self.tabs.addTab(self.create_animations_tab(), "🎬 Animations")
-        self.tabs.addTab(self.create_premium_tab(), "⭐ Premium Video")
-        self.tabs.addTab(self.create_video_only_tab(), "🎥 Video Only")
-        self.tabs.addTab(self.create_image_gen_tab(), "🖼️ Image Gen")
+        for spec in TABS:
+            self.tabs.addTab(self.build_tab(spec), spec.title)
 
         main_layout.addWidget(self.tabs)
 
-    def create_stickers_tab(self) -> QWidget:
-        """Create the Stickers tab."""
+    def build_tab(self, spec: TabSpec) -> QWidget:
+        """
+        Build one generator tab from its TabSpec: left controls (badge, info, cards, prompt,
+        tab-specific settings, cache toggle, Generate, progress, status) + right preview.
+        Widgets land on self as {spec.key}_prompt / _generate_btn / _progress / _status / _use_cache.
+        """
         tab = QWidget()
         layout = QHBoxLayout(tab)
         layout.setSpacing(24)
@@ -538,404 +867,156 @@ class StickerGeneratorApp(QMainWindow):
         left_layout = QVBoxLayout(left_panel)
         left_layout.setSpacing(16)
 
-        # Generator Type Selection
-        gen_group = QGroupBox("Generator Type")
-        gen_layout = QHBoxLayout(gen_group)
-
-        self.sticker_cards = []
-
-        free_card = GeneratorCard("Free Sticker", "Powered by Flux Model", "✨", is_free=True)
-        free_card.clicked.connect(self.on_sticker_generator_selected)
-        free_card.setSelected(True)
-        self.sticker_cards.append(free_card)
-        gen_layout.addWidget(free_card)
-
-        replicate_card = GeneratorCard("Replicate Sticker", "High quality generation", "🎨", is_free=False)
-        replicate_card.clicked.connect(self.on_sticker_generator_selected)
-        self.sticker_cards.append(replicate_card)
-        gen_layout.addWidget(replicate_card)
+        # Badge (PRO / FREE)
+        if spec.badge:
+            text, background, color = spec.badge
+            badge_layout = QHBoxLayout()
+            badge = QLabel(text)
+            badge.setStyleSheet(f"""
+                background-color: {background};
+                color: {color};
+                padding: 6px 12px;
+                border-radius: 6px;
+                font-weight: bold;
+            """)
+            badge_layout.addWidget(badge)
+            badge_layout.addStretch()
+            left_layout.addLayout(badge_layout)
 
-        gemini_card = GeneratorCard("Gemini Sticker", "With optional image reference", "🤖", is_free=False)
-        gemini_card.clicked.connect(self.on_sticker_generator_selected)
-        self.sticker_cards.append(gemini_card)
-        gen_layout.addWidget(gemini_card)
+        if spec.info:
+            info_label = QLabel(spec.info)
+            info_label.setStyleSheet(f"color: {TEXT_SECONDARY};")
+            info_label.setWordWrap(True)
+            left_layout.addWidget(info_label)
 
-        gen_layout.addStretch()
-        left_layout.addWidget(gen_group)
+        # Generator Type Selection
+        if spec.generators:
+            left_layout.addWidget(
+                self.create_generator_group(spec.generators, getattr(self, spec.on_generator_selected))
+            )
 
         # Prompt Input
-        prompt_label = QLabel("Prompt")
-        prompt_label.setObjectName("sectionTitle")
-        left_layout.addWidget(prompt_label)
-
-        self.sticker_prompt = QLineEdit()
-        self.sticker_prompt.setPlaceholderText("a person is going to school...")
-        left_layout.addWidget(self.sticker_prompt)
+        self.add_section_title(left_layout, spec.prompt_label)
 
-        hint_label = QLabel("Describe what you want your sticker to show")
-        hint_label.setStyleSheet(f"color: {TEXT_SECONDARY}; font-size: 12px;")
-        left_layout.addWidget(hint_label)
+        prompt = QLineEdit()
+        prompt.setPlaceholderText(spec.prompt_placeholder)
+        left_layout.addWidget(prompt)
+        setattr(self, f"{spec.key}_prompt", prompt)
 
-        # Reference Image (for Gemini)
-        self.ref_image_group = QGroupBox("Reference Image (Optional)")
-        ref_layout = QHBoxLayout(self.ref_image_group)
+        if spec.hint:
+            hint_label = QLabel(spec.hint)
+            hint_label.setStyleSheet(f"color: {TEXT_SECONDARY}; font-size: 12px;")
+            left_layout.addWidget(hint_label)
 
-        self.ref_image_path = QLineEdit()
-        self.ref_image_path.setPlaceholderText("No image selected")
-        self.ref_image_path.setReadOnly(True)
-        ref_layout.addWidget(self.ref_image_path)
-
-        browse_btn = QPushButton("Browse")
-        browse_btn.setObjectName("secondaryBtn")
-        browse_btn.setFixedWidth(100)
-        browse_btn.clicked.connect(self.browse_reference_image)
-        ref_layout.addWidget(browse_btn)
-
-        self.ref_image_group.setVisible(False)
-        left_layout.addWidget(self.ref_image_group)
-
-        # Animation Style
-        anim_label = QLabel("Animation Style")
-        anim_label.setObjectName("sectionTitle")
-        left_layout.addWidget(anim_label)
-
-        self.sticker_animation = QComboBox()
-        self.sticker_animation.addItems(["float", "bounce", "pulse", "wiggle", "static"])
-        left_layout.addWidget(self.sticker_animation)
+        # Tab-specific settings
+        getattr(self, spec.build_settings)(left_layout)
 
         left_layout.addStretch()
 
+        # Cache toggle (untick to force a fresh generation)
+        use_cache = QCheckBox("Reuse cached result for identical settings")
+        use_cache.setChecked(True)
+        left_layout.addWidget(use_cache)
+        setattr(self, f"{spec.key}_use_cache", use_cache)
+
         # Generate Button
-        self.sticker_generate_btn = QPushButton("🎨 Generate Free Sticker")
-        self.sticker_generate_btn.setFixedHeight(50)
-        self.sticker_generate_btn.clicked.connect(self.generate_sticker)
-        left_layout.addWidget(self.sticker_generate_btn)
+        generate_btn = QPushButton(spec.button_text)
+        generate_btn.setFixedHeight(50)
+        generate_btn.clicked.connect(getattr(self, spec.on_generate))
+        left_layout.addWidget(generate_btn)
+        setattr(self, f"{spec.key}_generate_btn", generate_btn)
 
         # Progress
-        self.sticker_progress = QProgressBar()
-        self.sticker_progress.setVisible(False)
-        left_layout.addWidget(self.sticker_progress)
+        progress = QProgressBar()
+        progress.setVisible(False)
+        left_layout.addWidget(progress)
+        setattr(self, f"{spec.key}_progress", progress)
 
-        self.sticker_status = QLabel("")
-        self.sticker_status.setStyleSheet(f"color: {TEXT_SECONDARY};")
-        left_layout.addWidget(self.sticker_status)
+        status = QLabel("")
+        status.setStyleSheet(f"color: {TEXT_SECONDARY};")
+        left_layout.addWidget(status)
+        setattr(self, f"{spec.key}_status", status)
 
         layout.addWidget(left_panel, stretch=1)
 
         # Right side - Preview
-        right_panel = self.create_preview_panel("sticker")
-        layout.addWidget(right_panel, stretch=1)
+        layout.addWidget(self.create_preview_panel(spec.panel_type), stretch=1)
 
         return tab
 
-    def generate_video_only(self):
-        prompt = self.video_only_prompt.text().strip()
-        if not prompt:
-            QMessageBox.warning(self, "Error", "Please enter a prompt")
-            return
-
-        aspect_ratio_key = VIDEO_ONLY_ASPECT_RATIOS[
-            self.video_only_ratio.currentText()
-        ]
+    def add_section_title(self, layout: QVBoxLayout, text: str):
+        label = QLabel(text)
+        label.setObjectName("sectionTitle")
+        layout.addWidget(label)
+
+    def add_spin_box(self, layout: QVBoxLayout, title: str, low: int, high: int, value: int) -> QSpinBox:
+        self.add_section_title(layout, title)
+        spin_box = QSpinBox()
+        spin_box.setRange(low, high)
+        spin_box.setValue(value)
+        layout.addWidget(spin_box)
+        return spin_box
+
+    def add_reference_group(self, layout: QVBoxLayout, on_browse) -> tuple:
+        """Optional reference image picker (shown for Gemini only) → (group, path field)."""
+        group = QGroupBox("Reference Image (Optional)")
+        ref_layout = QHBoxLayout(group)
+
+        path_field = QLineEdit()
+        path_field.setPlaceholderText("No image selected")
+        path_field.setReadOnly(True)
+        ref_layout.addWidget(path_field)
 
-        params = {
-            "prompt": prompt,
-            "duration": self.video_only_duration.value(),
-            "aspect_ratio": aspect_ratio_key,
-        }
-
-        self.start_worker("video_only", params, "video")
-
-    def create_animations_tab(self) -> QWidget:
-        """Create the Animations tab."""
-        tab = QWidget()
-        layout = QHBoxLayout(tab)
-        layout.setSpacing(24)
-
-        # Left side - Controls
-        left_panel = QWidget()
-        left_layout = QVBoxLayout(left_panel)
-        left_layout.setSpacing(16)
-
-        # Generator Type Selection
-        gen_group = QGroupBox("Generator Type")
-        gen_layout = QHBoxLayout(gen_group)
-
-        self.animation_cards = []
-
-        free_anim_card = GeneratorCard("Free Animation", "GPT + Pollinations", "✨", is_free=True)
-        free_anim_card.clicked.connect(self.on_animation_generator_selected)
-        free_anim_card.setSelected(True)
-        self.animation_cards.append(free_anim_card)
-        gen_layout.addWidget(free_anim_card)
-
-        replicate_anim_card = GeneratorCard("Replicate Animation", "GPT + Replicate", "🎨", is_free=False)
-        replicate_anim_card.clicked.connect(self.on_animation_generator_selected)
-        self.animation_cards.append(replicate_anim_card)
-        gen_layout.addWidget(replicate_anim_card)
+        browse_btn = QPushButton("Browse")
+        browse_btn.setObjectName("secondaryBtn")
+        browse_btn.setFixedWidth(100)
+        browse_btn.clicked.connect(on_browse)
+        ref_layout.addWidget(browse_btn)
 
-        gemini_anim_card = GeneratorCard("Gemini Animation", "GPT + Gemini", "🤖", is_free=False)
-        gemini_anim_card.clicked.connect(self.on_animation_generator_selected)
-        self.animation_cards.append(gemini_anim_card)
-        gen_layout.addWidget(gemini_anim_card)
+        group.setVisible(False)
+        layout.addWidget(group)
+        return group, path_field
 
-        gen_layout.addStretch()
-        left_layout.addWidget(gen_group)
+    # ============== TAB SETTINGS ==============
 
-        # Prompt Input
-        prompt_label = QLabel("Animation Concept")
-        prompt_label.setObjectName("sectionTitle")
-        left_layout.addWidget(prompt_label)
+    def build_sticker_settings(self, layout: QVBoxLayout):
+        # Reference Image (for Gemini)
+        self.ref_image_group, self.ref_image_path = self.add_reference_group(layout, self.browse_reference_image)
 
-        self.animation_prompt = QLineEdit()
-        self.animation_prompt.setPlaceholderText("a cat freezing into ice...")
-        left_layout.addWidget(self.animation_prompt)
+        # Animation Style
+        self.add_section_title(layout, "Animation Style")
+        self.sticker_animation = QComboBox()
+        self.sticker_animation.addItems(["float", "bounce", "pulse", "wiggle", "static"])
+        layout.addWidget(self.sticker_animation)
 
+    def build_animation_settings(self, layout: QVBoxLayout):
         # Reference Image (for Gemini Animation)
-        self.anim_ref_image_group = QGroupBox("Reference Image (Optional)")
-        anim_ref_layout = QHBoxLayout(self.anim_ref_image_group)
-
-        self.anim_ref_image_path = QLineEdit()
-        self.anim_ref_image_path.setPlaceholderText("No image selected")
-        self.anim_ref_image_path.setReadOnly(True)
-        anim_ref_layout.addWidget(self.anim_ref_image_path)
-
-        anim_browse_btn = QPushButton("Browse")
-        anim_browse_btn.setObjectName("secondaryBtn")
-        anim_browse_btn.setFixedWidth(100)
-        anim_browse_btn.clicked.connect(self.browse_anim_reference_image)
-        anim_ref_layout.addWidget(anim_browse_btn)
-
-        self.anim_ref_image_group.setVisible(False)
-        left_layout.addWidget(self.anim_ref_image_group)
+        self.anim_ref_image_group, self.anim_ref_image_path = self.add_reference_group(
+            layout, self.browse_anim_reference_image
+        )
 
-        # Settings
         # Settings - Only Frames (FPS removed)
-        frames_label = QLabel("Frames")
-        frames_label.setObjectName("sectionTitle")
-        left_layout.addWidget(frames_label)
-
-        self.animation_frames = QSpinBox()
-        self.animation_frames.setRange(2, 6)
-        self.animation_frames.setValue(3)
-        left_layout.addWidget(self.animation_frames)
-
-        left_layout.addStretch()
-
-        # Generate Button
-        self.animation_generate_btn = QPushButton("🎬 Generate Free Animation")
-        self.animation_generate_btn.setFixedHeight(50)
-        self.animation_generate_btn.clicked.connect(self.generate_animation)
-        left_layout.addWidget(self.animation_generate_btn)
-
-        # Progress
-        self.animation_progress = QProgressBar()
-        self.animation_progress.setVisible(False)
-        left_layout.addWidget(self.animation_progress)
-
-        self.animation_status = QLabel("")
-        self.animation_status.setStyleSheet(f"color: {TEXT_SECONDARY};")
-        left_layout.addWidget(self.animation_status)
-
-        layout.addWidget(left_panel, stretch=1)
+        self.animation_frames = self.add_spin_box(layout, "Frames", 2, 6, 3)
 
-        # Right side - Preview
-        right_panel = self.create_preview_panel("animation")
-        layout.addWidget(right_panel, stretch=1)
-
-        return tab
-
-    def create_premium_tab(self) -> QWidget:
-        """Create the Premium Video tab."""
-        tab = QWidget()
-        layout = QHBoxLayout(tab)
-        layout.setSpacing(24)
-
-        # Left side - Controls
-        left_panel = QWidget()
-        left_layout = QVBoxLayout(left_panel)
-        left_layout.setSpacing(16)
-
-        # PRO Badge
-        pro_layout = QHBoxLayout()
-        pro_badge = QLabel("⭐ PRO")
-        pro_badge.setStyleSheet(f"""
-            background-color: {WARNING_COLOR};
-            color: black;
-            padding: 6px 12px;
-            border-radius: 6px;
-            font-weight: bold;
-        """)
-        pro_layout.addWidget(pro_badge)
-        pro_layout.addStretch()
-        left_layout.addLayout(pro_layout)
-
-        info_label = QLabel("Uses Runware Video AI for smooth video-based animations")
-        info_label.setStyleSheet(f"color: {TEXT_SECONDARY};")
-        info_label.setWordWrap(True)
-        left_layout.addWidget(info_label)
-
-        # Prompt Input
-        prompt_label = QLabel("Video Prompt")
-        prompt_label.setObjectName("sectionTitle")
-        left_layout.addWidget(prompt_label)
-
-        self.video_prompt = QLineEdit()
-        self.video_prompt.setPlaceholderText("A cat becoming frozen, covered in ice...")
-        left_layout.addWidget(self.video_prompt)
-
-        # Settings
+    def build_video_settings(self, layout: QVBoxLayout):
         # Settings - Only Duration (FPS removed)
-        duration_label = QLabel("Duration (seconds)")
-        duration_label.setObjectName("sectionTitle")
-        left_layout.addWidget(duration_label)
-
-        self.video_duration = QSpinBox()
-        self.video_duration.setRange(1, 10)
-        self.video_duration.setValue(3)
-        left_layout.addWidget(self.video_duration)
+        self.video_duration = self.add_spin_box(layout, "Duration (seconds)", 1, 10, 3)
 
-        left_layout.addStretch()
-
-        # Generate Button
-        self.video_generate_btn = QPushButton("⭐ Generate Premium Video")
-        self.video_generate_btn.setFixedHeight(50)
-        self.video_generate_btn.clicked.connect(self.generate_video)
-        left_layout.addWidget(self.video_generate_btn)
-
-        # Progress
-        self.video_progress = QProgressBar()
-        self.video_progress.setVisible(False)
-        left_layout.addWidget(self.video_progress)
-
-        self.video_status = QLabel("")
-        self.video_status.setStyleSheet(f"color: {TEXT_SECONDARY};")
-        left_layout.addWidget(self.video_status)
-
-        layout.addWidget(left_panel, stretch=1)
-
-        # Right side - Preview
-        right_panel = self.create_preview_panel("video")
-        layout.addWidget(right_panel, stretch=1)
-
-        return tab
-
-    def create_video_only_tab(self) -> QWidget:
-        tab = QWidget()
-        layout = QHBoxLayout(tab)
-        layout.setSpacing(24)
-
-        # LEFT PANEL
-        left_panel = QWidget()
-        left_layout = QVBoxLayout(left_panel)
-        left_layout.setSpacing(16)
-
-        # Prompt
-        prompt_label = QLabel("Video Prompt")
-        prompt_label.setObjectName("sectionTitle")
-        left_layout.addWidget(prompt_label)
-
-        self.video_only_prompt = QLineEdit()
-        self.video_only_prompt.setPlaceholderText(
-            "A cinematic dragon flying through clouds..."
-        )
-        left_layout.addWidget(self.video_only_prompt)
-
-        # Duration
-        duration_label = QLabel("Duration (seconds)")
-        duration_label.setObjectName("sectionTitle")
-        left_layout.addWidget(duration_label)
-
-        self.video_only_duration = QSpinBox()
-        self.video_only_duration.setRange(1, 10)
-        self.video_only_duration.setValue(3)
-        left_layout.addWidget(self.video_only_duration)
+    def build_video_only_settings(self, layout: QVBoxLayout):
+        self.video_only_duration = self.add_spin_box(layout, "Duration (seconds)", 1, 10, 3)
 
         # Aspect Ratio
-        ratio_label = QLabel("Aspect Ratio")
-        ratio_label.setObjectName("sectionTitle")
-        left_layout.addWidget(ratio_label)
-
+        self.add_section_title(layout, "Aspect Ratio")
         self.video_only_ratio = QComboBox()
         self.video_only_ratio.addItems(VIDEO_ONLY_ASPECT_RATIOS.keys())
-        left_layout.addWidget(self.video_only_ratio)
-
-        left_layout.addStretch()
-
-        # Generate Button
-        self.video_only_generate_btn = QPushButton("🎥 Generate Video")
-        self.video_only_generate_btn.setFixedHeight(50)
-        self.video_only_generate_btn.clicked.connect(self.generate_video_only)
-        left_layout.addWidget(self.video_only_generate_btn)
-
-        layout.addWidget(left_panel, 1)
-
-        self.video_only_progress = QProgressBar()
-        self.video_only_progress.setVisible(False)
-        left_layout.addWidget(self.video_only_progress)
-
-        self.video_only_status = QLabel("")
-        self.video_only_status.setStyleSheet(f"color: {TEXT_SECONDARY};")
-        left_layout.addWidget(self.video_only_status)
-
-        # RIGHT PANEL (PREVIEW)
-        right_panel = self.create_preview_panel("video")
-        layout.addWidget(right_panel, 1)
-
-        return tab
-
-    def create_image_gen_tab(self) -> QWidget:
-        """Create the Image Generation tab."""
-        tab = QWidget()
-        layout = QHBoxLayout(tab)
-        layout.setSpacing(24)
-
-        # Left side - Controls
-        left_panel = QWidget()
-        left_layout = QVBoxLayout(left_panel)
-        left_layout.setSpacing(16)
-
-        # FREE Badge
-        free_layout = QHBoxLayout()
-        free_badge = QLabel("🆓 FREE")
-        free_badge.setStyleSheet(f"""
-            background-color: {SUCCESS_COLOR};
-            color: white;
-            padding: 6px 12px;
-            border-radius: 6px;
-            font-weight: bold;
-        """)
-        free_layout.addWidget(free_badge)
-        free_layout.addStretch()
-        left_layout.addLayout(free_layout)
-
-        info_label = QLabel("Generate images using Pollinations.ai (Flux Model) - No API key required!")
-        info_label.setStyleSheet(f"color: {TEXT_SECONDARY};")
-        info_label.setWordWrap(True)
-        left_layout.addWidget(info_label)
+        layout.addWidget(self.video_only_ratio)
 
-        # Prompt Input
-        prompt_label = QLabel("Prompt")
-        prompt_label.setObjectName("sectionTitle")
-        left_layout.addWidget(prompt_label)
-
-        self.image_prompt = QLineEdit()
-        self.image_prompt.setPlaceholderText("A beautiful sunset over mountains...")
-        left_layout.addWidget(self.image_prompt)
-
-        hint_label = QLabel("Describe the image you want to generate")
-        hint_label.setStyleSheet(f"color: {TEXT_SECONDARY}; font-size: 12px;")
-        left_layout.addWidget(hint_label)
-
-        # Size Settings
+    def build_image_settings(self, layout: QVBoxLayout):
         # Image Size (Aspect Ratio)
         size_group = QGroupBox("Image Size")
         size_layout = QVBoxLayout(size_group)
 
-        ratio_label = QLabel("Aspect Ratio")
-        ratio_label.setObjectName("sectionTitle")
-        size_layout.addWidget(ratio_label)
-
+        self.add_section_title(size_layout, "Aspect Ratio")
         self.image_aspect_ratio = QComboBox()
         self.image_aspect_ratio.addItems([
             "1:1 (Square) – 1024x1024",
@@ -947,54 +1028,10 @@ class StickerGeneratorApp(QMainWindow):
         ])
         size_layout.addWidget(self.image_aspect_ratio)
 
-        left_layout.addWidget(size_group)
-
-        # Seed
-        # seed_layout = QHBoxLayout()
-        #
-        # seed_label = QLabel("Seed")
-        # seed_label.setObjectName("sectionTitle")
-        # seed_layout.addWidget(seed_label)
-        #
-        # self.image_seed = QSpinBox()
-        # self.image_seed.setRange(1, 99999)
-        # self.image_seed.setValue(42)
-        # seed_layout.addWidget(self.image_seed)
-        #
-        # random_seed_btn = QPushButton("🎲")
-        # random_seed_btn.setObjectName("secondaryBtn")
-        # random_seed_btn.setFixedWidth(40)
-        # random_seed_btn.setToolTip("Random seed")
-        # random_seed_btn.clicked.connect(self.randomize_seed)
-        # seed_layout.addWidget(random_seed_btn)
-        #
-        # seed_layout.addStretch()
-        # left_layout.addLayout(seed_layout)
-
-        left_layout.addStretch()
-
-        # Generate Button
-        self.image_generate_btn = QPushButton("🖼️ Generate Image")
-        self.image_generate_btn.setFixedHeight(50)
-        self.image_generate_btn.clicked.connect(self.generate_image)
-        left_layout.addWidget(self.image_generate_btn)
-
-        # Progress
-        self.image_progress = QProgressBar()
-        self.image_progress.setVisible(False)
-        left_layout.addWidget(self.image_progress)
+        layout.addWidget(size_group)
 
-        self.image_status = QLabel("")
-        self.image_status.setStyleSheet(f"color: {TEXT_SECONDARY};")
-        left_layout.addWidget(self.image_status)
-
-        layout.addWidget(left_panel, stretch=1)
-
-        # Right side - Preview
-        right_panel = self.create_preview_panel("image")
-        layout.addWidget(right_panel, stretch=1)
-
-        return tab
+        # Count
+        self.image_count = self.add_spin_box(layout, f"Count (1–{MAX_IMAGE_COUNT})", 1, MAX_IMAGE_COUNT, 1)
 
     # def set_image_size(self, width: int, height: int):
     #     """Set image dimensions from preset."""
@@ -1006,6 +1043,61 @@ class StickerGeneratorApp(QMainWindow):
     #     import random
     #     self.image_seed.setValue(random.randint(1, 99999))
 
+    def create_generator_group(self, generators: list, on_selected) -> QGroupBox:
+        """Generator cards as checkable tool buttons in one exclusive group (styled by QSS states)."""
+        gen_group = QGroupBox("Generator Type")
+        gen_layout = QHBoxLayout(gen_group)
+
+        buttons = QButtonGroup(gen_group)
+        buttons.setExclusive(True)
+
+        for i, generator in enumerate(generators):
+            button = QToolButton()
+            button.setObjectName("generatorCard")
+            button.setToolTip(generator["description"])
+            button.setCheckable(True)
+            button.setChecked(i == 0)
+            button.setFixedSize(160, 130)
+            button.setCursor(Qt.CursorShape.PointingHandCursor)
+            self.add_card_contents(button, generator)
+            buttons.addButton(button, i)
+            gen_layout.addWidget(button)
+
+        buttons.idClicked.connect(lambda i: on_selected(generators[i]["name"]))
+
+        gen_layout.addStretch()
+        return gen_group
+
+    def add_card_contents(self, button: QToolButton, generator: dict):
+        """Large icon over the bold name (+ green FREE pill), as labels the clicks pass through."""
+        layout = QVBoxLayout(button)
+        layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.setSpacing(8)
+
+        icon_label = QLabel(generator["icon"])
+        icon_label.setFont(ui_font(24))
+        icon_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(icon_label)
+
+        name_layout = QHBoxLayout()
+        name_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        name_label = QLabel(generator["name"])
+        name_label.setFont(ui_font(9, bold=True))
+        name_label.setWordWrap(True)
+        name_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        name_layout.addWidget(name_label)
+        labels = [icon_label, name_label]
+
+        if generator["free"]:
+            free_badge = QLabel("FREE")
+            free_badge.setObjectName("freeBadge")
+            name_layout.addWidget(free_badge)
+            labels.append(free_badge)
+
+        layout.addLayout(name_layout)
+        for label in labels:
+            label.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+
     def create_preview_panel(self, panel_type: str) -> QFrame:
         """Create a preview panel."""
         frame = QFrame()
@@ -1015,7 +1107,7 @@ class StickerGeneratorApp(QMainWindow):
 
         # Title
         title = QLabel("Preview")
-        title.setFont(QFont("Segoe UI", 14, QFont.Weight.Bold))
+        title.setFont(ui_font(14, bold=True))
         layout.addWidget(title)
 
         # Preview area
@@ -1028,30 +1120,16 @@ class StickerGeneratorApp(QMainWindow):
         preview_label = QLabel()
         preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         preview_label.setMinimumSize(400, 400)
+        # One reusable compositing surface per panel (grid previews paint into it, no per-update allocation)
+        self.preview_buffers[preview_label] = QImage(400, 400, QImage.Format.Format_ARGB32_Premultiplied)
 
-        # Store reference based on panel type
-        if panel_type == "sticker":
-            self.sticker_preview_label = preview_label
-        elif panel_type == "animation":
-            self.animation_preview_label = preview_label
-        elif panel_type == "image":
-            self.image_preview_label = preview_label
-        else:
-            self.video_preview_label = preview_label
+        setattr(self, f"{panel_type}_preview_label", preview_label)
 
         # Placeholder
         placeholder = QLabel("🖼️\n\nNo preview yet\nGenerate something to see it here")
         placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
         placeholder.setStyleSheet(f"color: {TEXT_SECONDARY};")
-
-        if panel_type == "sticker":
-            self.sticker_placeholder = placeholder
-        elif panel_type == "animation":
-            self.animation_placeholder = placeholder
-        elif panel_type == "image":
-            self.image_placeholder = placeholder
-        else:
-            self.video_placeholder = placeholder
+        setattr(self, f"{panel_type}_placeholder", placeholder)
 
         preview_layout.addWidget(placeholder)
         preview_layout.addWidget(preview_label)
@@ -1073,18 +1151,11 @@ class StickerGeneratorApp(QMainWindow):
 
         else:
             # Sticker / Animation / Image
-            save_btn = QPushButton("💾 Save Sticker")
+            save_btn = QPushButton("💾 Save Image" if panel_type == "image" else "💾 Save Sticker")
             save_btn.setObjectName("secondaryBtn")
             save_btn.clicked.connect(lambda: self.save_sticker(panel_type))
             save_btn.setEnabled(False)
-
-            if panel_type == "sticker":
-                self.sticker_save_btn = save_btn
-            elif panel_type == "animation":
-                self.animation_save_btn = save_btn
-            elif panel_type == "image":
-                save_btn.setText("💾 Save Image")
-                self.image_save_btn = save_btn
+            setattr(self, f"{panel_type}_save_btn", save_btn)
 
             layout.addWidget(save_btn)
 
@@ -1096,9 +1167,6 @@ class StickerGeneratorApp(QMainWindow):
         """Handle sticker generator selection."""
         self.current_generator = name
 
-        for card in self.sticker_cards:
-            card.setSelected(card.name == name)
-
         # Update button text
         self.sticker_generate_btn.setText(f"🎨 Generate {name}")
 
@@ -1109,32 +1177,55 @@ class StickerGeneratorApp(QMainWindow):
         """Handle animation generator selection."""
         self.current_animation_generator = name
 
-        for card in self.animation_cards:
-            card.setSelected(card.name == name)
-
         # Update button text
         self.animation_generate_btn.setText(f"🎬 Generate {name}")
 
         # Show/hide reference image option for Gemini
         self.anim_ref_image_group.setVisible(name == "Gemini Animation")
 
-    def browse_reference_image(self):
-        """Browse for reference image."""
+    def pick_reference_image(self) -> str:
+        """Reference image dialog, opened in the folder the last pick came from."""
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select Reference Image", "",
+            self, "Select Reference Image", self.last_ref_dir,
             "Images (*.png *.jpg *.jpeg *.webp)"
         )
+        if file_path:
+            self.last_ref_dir = os.path.dirname(file_path)
+        return file_path
+
+    def browse_reference_image(self):
+        """Browse for reference image."""
+        file_path = self.pick_reference_image()
         if file_path:
             self.ref_image_path.setText(file_path)
+            self.prefetch_reference_image(file_path)
 
     def browse_anim_reference_image(self):
         """Browse for animation reference image."""
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select Reference Image", "",
-            "Images (*.png *.jpg *.jpeg *.webp)"
-        )
+        file_path = self.pick_reference_image()
         if file_path:
             self.anim_ref_image_path.setText(file_path)
+            self.prefetch_reference_image(file_path)
+
+    def prefetch_reference_image(self, path: str):
+        """
+        Downscale the reference once in the background while the user types (kept on disk,
+        so big phone photos are never re-read or re-uploaded at full size, even after a restart);
+        the Gemini controllers then hit the same (path, mtime, size) cache on every run.
+        """
+        def prefetch():
+            try:
+                prepared = _controller("prepare_reference_file")(path, REF_CACHE_DIR)
+                _controller("load_reference_image")(prepared)
+                self.prepared_refs[path] = prepared
+            except Exception as e:
+                print(f"⚠️ Could not prepare reference image: {e}")
+
+        self.pool.start(prefetch)
+
+    def reference_for(self, path: str) -> Optional[str]:
+        """The prepared copy of a picked reference image (the original until it is ready)."""
+        return self.prepared_refs.get(path, path) if path else None
 
     def generate_sticker(self):
         """Generate sticker based on selected generator."""
@@ -1156,7 +1247,8 @@ class StickerGeneratorApp(QMainWindow):
             "prompt": prompt,
             "animation": self.sticker_animation.currentText(),
             "output_file": "output_sticker.webp",
-            "reference_image": self.ref_image_path.text() if self.ref_image_path.text() else None
+            "reference_image": self.reference_for(self.ref_image_path.text()),
+            "use_cache": self.sticker_use_cache.isChecked(),
         }
 
         self.start_worker(task_type, params, "sticker")
@@ -1181,7 +1273,8 @@ class StickerGeneratorApp(QMainWindow):
             "num_frames": self.animation_frames.value(),
             "fps": 3,  # Fixed FPS
             "output_file": "output_animation.webp",
-            "reference_image": self.anim_ref_image_path.text() if self.anim_ref_image_path.text() else None
+            "reference_image": self.reference_for(self.anim_ref_image_path.text()),
+            "use_cache": self.animation_use_cache.isChecked(),
         }
 
         self.start_worker(task_type, params, "animation")
@@ -1196,7 +1289,8 @@ class StickerGeneratorApp(QMainWindow):
         params = {
             "prompt": prompt,
             "duration": self.video_duration.value(),
-            "fps": 10
+            "fps": 10,
+            "use_cache": self.video_use_cache.isChecked(),
         }
 
         self.start_worker("video_animation", params, "video")
@@ -1215,87 +1309,106 @@ class StickerGeneratorApp(QMainWindow):
             "prompt": prompt,
             "aspect_ratio": aspect_ratio,
             "output_file": "output_image.jpg",
+            "count": self.image_count.value(),
+            "use_cache": self.image_use_cache.isChecked(),
         }
 
         self.start_worker("image_generation", params, "image")
 
-    def start_worker(self, task_type: str, params: dict, panel_type: str):
-        """Start background worker for generation."""
-        # Disable button and show progress
-        if panel_type == "sticker":
-            self.sticker_generate_btn.setEnabled(False)
-            self.sticker_progress.setVisible(True)
-            self.sticker_progress.setRange(0, 0)  # Indeterminate
-            self.sticker_status.setText("Starting...")
-        elif panel_type == "animation":
-            self.animation_generate_btn.setEnabled(False)
-            self.animation_progress.setVisible(True)
-            self.animation_progress.setRange(0, 0)
-            self.animation_status.setText("Starting...")
-
-        elif panel_type == "image":
-            self.image_generate_btn.setEnabled(False)
-            self.image_progress.setVisible(True)
-            self.image_progress.setRange(0, 0)
-            self.image_status.setText("Starting...")
-
-
-        elif panel_type == "video":
-
-            # Premium Video OR Video Only
-
-            if hasattr(self, "video_only_generate_btn"):
-
-                self.video_only_generate_btn.setEnabled(False)
-
-                self.video_only_progress.setVisible(True)
-
-                self.video_only_progress.setRange(0, 0)
-
-                self.video_only_status.setText("Starting...")
-
-            else:
+    def generate_video_only(self):
+        prompt = self.video_only_prompt.text().strip()
+        if not prompt:
+            QMessageBox.warning(self, "Error", "Please enter a prompt")
+            return
 
-                self.video_generate_btn.setEnabled(False)
+        aspect_ratio_key = VIDEO_ONLY_ASPECT_RATIOS[
+            self.video_only_ratio.currentText()
+        ]
 
-                self.video_progress.setVisible(True)
+        params = {
+            "prompt": prompt,
+            "duration": self.video_only_duration.value(),
+            "aspect_ratio": aspect_ratio_key,
+            "use_cache": self.video_only_use_cache.isChecked(),
+        }
 
-                self.video_progress.setRange(0, 0)
+        self.start_worker("video_only", params, "video")
 
-                self.video_status.setText("Starting...")
+    def start_worker(self, task_type: str, params: dict, panel_type: str):
+        """Start background worker for generation."""
+        try:
+            key = _cache_key(task_type, params)
+        except OSError:  # reference image unreadable → let the worker report it
+            key = None
+
+        # Same inputs as this panel's last result, still on disk → show it again, no worker at all
+        last = self._last_results.get(panel_type)
+        if key and params.get("use_cache", True) and last and last[0] == key \
+                and all(os.path.exists(part) for part in last[1].split("|")):
+            self.on_generation_finished(last[1], panel_type)
+            self.statusBar().showMessage("♻️ Reusing previous result", 3000)
+            return
 
-        # Create and start worker
-        self.worker = WorkerThread(task_type, params)
-        self.worker.finished.connect(lambda path: self.on_generation_finished(path, panel_type))
-        self.worker.error.connect(lambda err: self.on_generation_error(err, panel_type))
-        self.worker.progress.connect(lambda msg: self.on_generation_progress(msg, panel_type))
-        self.worker.start()
+        # Disable button and show progress
+        button, progress, status = self.panel_controls(panel_type)
+        button.setEnabled(False)
+        progress.setVisible(True)
+        progress.setRange(0, 0)  # Indeterminate
+        status.setText("Starting...")
+
+        # Identical job already running → attach to it; otherwise create and queue a worker
+        worker = self._inflight.get(key) if key else None
+        if worker is None:
+            worker = WorkerRunnable(task_type, params, key)
+            worker.preview_size = int(400 * self.devicePixelRatioF())
+            if key:
+                self._inflight[key] = worker
+                worker.signals.finished.connect(lambda _: self._inflight.pop(key, None))
+                worker.signals.error.connect(lambda _: self._inflight.pop(key, None))
+            self.pool.start(worker)
+
+        # Joined a job this panel already listens to (e.g. a repeat Premium Video click) → no second set of handlers
+        if panel_type not in worker.panels:
+            worker.panels.add(panel_type)
+            if key:
+                worker.signals.finished.connect(lambda path: self._last_results.__setitem__(panel_type, (key, path)))
+            # partial: the emitted str goes straight to the handler, no extra Python frame per signal
+            worker.signals.finished.connect(partial(self.on_generation_finished, panel_type=panel_type))
+            worker.signals.error.connect(partial(self.on_generation_error, panel_type=panel_type))
+            worker.signals.progress.connect(partial(self.on_generation_progress, panel_type=panel_type))
+        # (kept referenced until it reports back)
+        self.workers[panel_type] = worker
+
+    def panel_controls(self, panel_type: str) -> tuple:
+        """(Generate button, progress bar, status label) that show a panel's jobs."""
+        key = self.PANEL_CONTROLS[panel_type]
+        return (getattr(self, f"{key}_generate_btn"), getattr(self, f"{key}_progress"),
+                getattr(self, f"{key}_status"))
+
+    def enable_debounced(self, button: QPushButton):
+        """Re-enable a Generate button after CLICK_DEBOUNCE_MS instead of immediately."""
+        QTimer.singleShot(CLICK_DEBOUNCE_MS, lambda: button.setEnabled(True))
 
     def on_generation_progress(self, message: str, panel_type: str):
         """Update progress message."""
-        if panel_type == "sticker":
-            self.sticker_status.setText(message)
-        elif panel_type == "animation":
-            self.animation_status.setText(message)
-        else:
-            self.video_status.setText(message)
+        self.panel_controls(panel_type)[2].setText(message)
 
     def on_generation_finished(self, output_path: str, panel_type: str):
         """Handle generation completion."""
+        worker = self.workers.pop(panel_type, None)
         # self.current_preview_path = output_path
+        button, progress, _ = self.panel_controls(panel_type)
+        self.enable_debounced(button)
+        progress.setVisible(False)
 
         # Update UI
         if panel_type == "sticker":
-            self.sticker_generate_btn.setEnabled(True)
-            self.sticker_progress.setVisible(False)
             self.sticker_preview_path = output_path
             self.sticker_status.setText(f"✅ Saved: {output_path}")
             self.sticker_save_btn.setEnabled(True)
             self.update_preview(output_path, self.sticker_preview_label, self.sticker_placeholder)
 
         elif panel_type == "animation":
-            self.animation_generate_btn.setEnabled(True)
-            self.animation_progress.setVisible(False)
             self.animation_preview_path = output_path
             self.animation_status.setText(f"✅ Saved: {output_path}")
             self.animation_save_btn.setEnabled(True)
@@ -1303,12 +1416,19 @@ class StickerGeneratorApp(QMainWindow):
 
 
         elif panel_type == "image":
-            self.image_generate_btn.setEnabled(True)
-            self.image_progress.setVisible(False)
-            self.image_preview_path = output_path
-            self.image_status.setText(f"✅ Saved: {output_path}")
             self.image_save_btn.setEnabled(True)
-            self.update_preview(output_path, self.image_preview_label, self.image_placeholder)
+
+            if "|" in output_path:
+                # Batch → grid preview; Save Image saves the first one
+                paths = output_path.split("|")
+                self.image_preview_path = paths[0]
+                self.image_status.setText(f"✅ Saved {len(paths)} images: {', '.join(paths)}")
+                self.update_preview_grid(paths, self.image_preview_label, self.image_placeholder)
+            else:
+                self.image_preview_path = output_path
+                self.image_status.setText(f"✅ Saved: {output_path}")
+                self.update_preview(output_path, self.image_preview_label, self.image_placeholder,
+                                    worker.thumbnail if worker else None)
 
 
 
@@ -1317,10 +1437,6 @@ class StickerGeneratorApp(QMainWindow):
 
             # ===== VIDEO ONLY (MP4) =====
 
-            self.video_only_generate_btn.setEnabled(True)
-
-            self.video_only_progress.setVisible(False)
-
             self.current_video_mp4_path = output_path
 
             self.video_only_status.setText("✅ Video generated. Click Save MP4.")
@@ -1359,10 +1475,6 @@ class StickerGeneratorApp(QMainWindow):
 
                 output_path = webp_path
 
-            self.video_generate_btn.setEnabled(True)
-
-            self.video_progress.setVisible(False)
-
             self.video_status.setText(f"✅ Saved: {output_path}")
 
             self.video_save_btn.setEnabled(True)
@@ -1381,45 +1493,70 @@ class StickerGeneratorApp(QMainWindow):
 
     def on_generation_error(self, error: str, panel_type: str):
         """Handle generation error."""
-        if panel_type == "sticker":
-            self.sticker_generate_btn.setEnabled(True)
-            self.sticker_progress.setVisible(False)
-            self.sticker_status.setText(f"❌ Error: {error}")
-        elif panel_type == "animation":
-            self.animation_generate_btn.setEnabled(True)
-            self.animation_progress.setVisible(False)
-            self.animation_status.setText(f"❌ Error: {error}")
-
-        elif panel_type == "image":
-            self.image_generate_btn.setEnabled(True)
-            self.image_progress.setVisible(False)
-            self.image_status.setText(f"❌ Error: {error}")
-
-        else:
-            self.video_generate_btn.setEnabled(True)
-            self.video_progress.setVisible(False)
-            self.video_status.setText(f"❌ Error: {error}")
+        self.workers.pop(panel_type, None)
+        button, progress, status = self.panel_controls(panel_type)
+        self.enable_debounced(button)
+        progress.setVisible(False)
+        status.setText(f"❌ Error: {error}")
 
         QMessageBox.critical(self, "Generation Error", str(error))
 
-    def update_preview(self, path: str, label: QLabel, placeholder: QLabel):
-        """Update preview with generated image/animation."""
+    def update_preview(self, path: str, label: QLabel, placeholder: QLabel, image: Optional[QImage] = None):
+        """Update preview with generated image/animation (`image`: a still already decoded at display size)."""
         placeholder.setVisible(False)
         label.setVisible(True)
 
-        if path.endswith('.webp') or path.endswith('.gif'):
-            # Animated preview
-            movie = QMovie(path)
-            movie.setScaledSize(QSize(300, 300))
+        mtime = os.path.getmtime(path)  # outputs are overwritten in place → part of every cache key
+
+        if path.endswith(ANIMATED_SUFFIXES):
+            # Animated preview: each frame decoded and scaled to 300x300 once, on the first loop,
+            # then replayed from QMovie's cache; the same unchanged file on the same label reuses it
+            shown = self.preview_movies.get(label)
+            if shown and shown[0] == (path, mtime):
+                movie = shown[1]
+            else:
+                if shown:
+                    shown[1].stop()  # dropped below → its frame cache is freed
+                movie = QMovie(path)
+                movie.setCacheMode(QMovie.CacheMode.CacheAll)
+                movie.setScaledSize(QSize(300, 300))
+                self.preview_movies[label] = ((path, mtime), movie)
             label.setMovie(movie)
             movie.start()
         else:
-            # Static image
-            pixmap = QPixmap(path)
-            pixmap = pixmap.scaled(400, 400, Qt.AspectRatioMode.KeepAspectRatio,
-                                   Qt.TransformationMode.SmoothTransformation)
+            # Static image, decoded at the label's physical pixel size once per file version
+            dpr = self.devicePixelRatioF()
+            key = f"{path}:{mtime}:{dpr}"
+            pixmap = QPixmapCache.find(key)
+            if pixmap is None:
+                if image is None or image.isNull() or max(image.width(), image.height()) != int(400 * dpr):
+                    image = read_scaled_image(path, int(400 * dpr))
+                pixmap = QPixmap.fromImage(image)
+                pixmap.setDevicePixelRatio(dpr)
+                QPixmapCache.insert(key, pixmap)
             label.setPixmap(pixmap)
 
+    def update_preview_grid(self, paths: list, label: QLabel, placeholder: QLabel):
+        """Show several static images as one grid preview, composited into the panel's buffer."""
+        placeholder.setVisible(False)
+        label.setVisible(True)
+
+        grid = self.preview_buffers[label]
+        cols = math.ceil(math.sqrt(len(paths)))
+        cell = min(grid.width(), grid.height()) // cols
+
+        grid.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(grid)
+        for i, path in enumerate(paths):
+            image = read_scaled_image(path, cell)
+            x = (i % cols) * cell + (cell - image.width()) // 2
+            y = (i // cols) * cell + (cell - image.height()) // 2
+            painter.drawImage(x, y, image)
+        painter.end()
+
+        # Buffer is already premultiplied ARGB32 → no channel conversion on upload
+        label.setPixmap(QPixmap.fromImage(grid, Qt.ImageConversionFlag.NoFormatConversion))
+
     def save_sticker(self, panel_type: str):
         path_map = {
             "sticker": self.sticker_preview_path,
@@ -1430,53 +1567,70 @@ class StickerGeneratorApp(QMainWindow):
 
         source_path = path_map.get(panel_type)
 
-        if not source_path or not os.path.exists(source_path):
+        # No exists() probe: a vanished file surfaces as CopyRunnable's OSError instead
+        if not source_path:
             QMessageBox.warning(self, "Error", "No valid file to save.")
             return
 
-        save_path, _ = QFileDialog.getSaveFileName(
-            self,
-            "Save File",
-            os.path.basename(source_path),
-            "WebP Files (*.webp);;All Files (*)"
-        )
+        save_path = self.pick_save_path("Save File", os.path.basename(source_path),
+                                        "WebP Files (*.webp);;All Files (*)")
 
         if save_path:
-            import shutil
-            shutil.copy(source_path, save_path)
-            QMessageBox.information(self, "Saved", f"Saved to:\n{save_path}")
+            self.start_copy(source_path, save_path, f"Saved to:\n{save_path}")
 
     def save_video_mp4(self):
         """Save the generated MP4 video to user-selected location."""
         if not self.current_video_mp4_path:
             return
 
-        save_path, _ = QFileDialog.getSaveFileName(
-            self, "Save Video", "video.mp4",
-            "MP4 Files (*.mp4);;All Files (*)"
-        )
+        save_path = self.pick_save_path("Save Video", "video.mp4", "MP4 Files (*.mp4);;All Files (*)")
 
         if save_path:
-            import shutil
-            shutil.copy(self.current_video_mp4_path, save_path)
-            QMessageBox.information(self, "Saved", f"Video saved to:\n{save_path}")
+            self.start_copy(self.current_video_mp4_path, save_path, f"Video saved to:\n{save_path}")
+
+    def pick_save_path(self, caption: str, name: str, filters: str) -> str:
+        """
+        Save dialog opened in the last save folder; symlinks and custom folder icons
+        aren't resolved, so the listing doesn't stat/probe every entry. "" if cancelled.
+        """
+        dialog = QFileDialog(self, caption, self.last_save_dir, filters)
+        dialog.setAcceptMode(QFileDialog.AcceptMode.AcceptSave)
+        dialog.setOption(QFileDialog.Option.DontResolveSymlinks, True)
+        dialog.setOption(QFileDialog.Option.DontUseCustomDirectoryIcons, True)
+        dialog.selectFile(name)
+        if not dialog.exec():
+            return ""
+        save_path = dialog.selectedFiles()[0]
+        self.last_save_dir = os.path.dirname(save_path)
+        return save_path
+
+    def start_copy(self, source_path: str, save_path: str, message: str):
+        """Copy an output on the pool so a slow target disk can't freeze the window."""
+        job = CopyRunnable(source_path, save_path)
+        self.copies.add(job)  # (kept referenced until it reports back)
+        job.signals.finished.connect(lambda _: self.on_copy_done(job, message))
+        job.signals.error.connect(lambda err: self.on_copy_done(job, err, failed=True))
+        self.pool.start(job)
+
+    def on_copy_done(self, job: "CopyRunnable", message: str, failed: bool = False):
+        self.copies.discard(job)
+        if failed:
+            QMessageBox.critical(self, "Error", f"Could not save file:\n{message}")
+        else:
+            QMessageBox.information(self, "Saved", message)
 
 
 def main():
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
+    QPixmapCache.setCacheLimit(PIXMAP_CACHE_KB)
+    # Parsed once for the whole app: every window, dialog and new widget shares the same QSS
+    app.setStyleSheet(build_stylesheet("dark"))
 
     # Set dark palette
     palette = QPalette()
-    palette.setColor(QPalette.ColorRole.Window, QColor(DARK_BG))
-    palette.setColor(QPalette.ColorRole.WindowText, QColor(TEXT_COLOR))
-    palette.setColor(QPalette.ColorRole.Base, QColor(DARKER_BG))
-    palette.setColor(QPalette.ColorRole.AlternateBase, QColor(CARD_BG))
-    palette.setColor(QPalette.ColorRole.Text, QColor(TEXT_COLOR))
-    palette.setColor(QPalette.ColorRole.Button, QColor(CARD_BG))
-    palette.setColor(QPalette.ColorRole.ButtonText, QColor(TEXT_COLOR))
-    palette.setColor(QPalette.ColorRole.Highlight, QColor(ACCENT_COLOR))
-    palette.setColor(QPalette.ColorRole.HighlightedText, QColor(TEXT_COLOR))
+    for role, color in PALETTE_COLORS:
+        palette.setColor(role, color)
     app.setPalette(palette)
 
     window = StickerGeneratorApp()